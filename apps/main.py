@@ -1,3 +1,14 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
-app = FastAPI()
+from apps.utils.database import dispose_async_engine
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await dispose_async_engine()
+
+
+app = FastAPI(lifespan=lifespan)
@@ -0,0 +1,116 @@
+import asyncio
+import importlib
+import os
+import time
+
+import pandas as pd
+
+from apps.utils.bulk_extract import (
+    copy_dataframe,
+    fetch_dataframe,
+    fetch_dataframe_async,
+)
+from apps.utils.csv_export import export_evaluation_metrics_to_csv
+from apps.utils.database import dispose_async_engine
+
+# Prophet scripts whose raw `query` is extracted each way. The scripts' own
+# fetch functions may answer from the rollups instead, so they aren't timed
+FETCH_MODULES = {
+    "TRD/revenue": "apps.scripts.brandDotCom.prophet.TRD.revenue_prophet",
+    "sourceTraffic/visits": (
+        "apps.scripts.brandDotCom.prophet.sourceTraffic.visits_prophet"
+    ),
+    "channelMix/revenue": "apps.scripts.brandDotCom.prophet.channelMix.revenue_prophet",
+    "vnr/revenue": "apps.scripts.brandDotCom.prophet.vnr.revenue_prophet",
+}
+
+
+def time_call(func, *args, repeats: int = 5):
+    timings = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return result, min(timings), sum(timings) / len(timings)
+
+
+async def fetch_async(query, params, columns) -> pd.DataFrame:
+    # The async pool is bound to the loop that created it, and every
+    # asyncio.run brings a new loop
+    try:
+        return await fetch_dataframe_async(query, params, columns)
+    finally:
+        await dispose_async_engine()
+
+
+def frames_match(fetchall_df: pd.DataFrame, copy_df: pd.DataFrame) -> bool:
+    # fetchall gives Decimal/tz-aware values, COPY gives float/UTC; compare
+    # the values generate_forecast actually uses
+    if len(fetchall_df) != len(copy_df):
+        return False
+    if fetchall_df.empty:
+        return True
+    left = fetchall_df.copy()
+    right = copy_df.copy()
+    for df in (left, right):
+        df["ds"] = pd.to_datetime(df["ds"]).dt.tz_localize(None)
+        df["y"] = df["y"].astype(float)
+    return left.reset_index(drop=True).equals(right.reset_index(drop=True))
+
+
+def main():
+    hotel_code = "BOSFRUP"
+    repeats = 5
+    results = []
+
+    for name, module_name in FETCH_MODULES.items():
+        module = importlib.import_module(module_name)
+        params = {"hotel_code": hotel_code}
+
+        fetchall_df, fetchall_best, fetchall_mean = time_call(
+            fetch_dataframe, module.query, params, module.columns, repeats=repeats
+        )
+        async_df, async_best, async_mean = time_call(
+            lambda: asyncio.run(fetch_async(module.query, params, module.columns)),
+            repeats=repeats,
+        )
+        copy_df, copy_best, copy_mean = time_call(
+            lambda: copy_dataframe(
+                module.query, params, module.columns, datetime_columns=["ds"]
+            ),
+            repeats=repeats,
+        )
+
+        print(f"\n=== {name} ({len(fetchall_df)} rows) ===")
+        print(
+            f"fetchall: best {fetchall_best * 1000:.1f}ms, mean {fetchall_mean * 1000:.1f}ms"
+        )
+        print(
+            f"async:    best {async_best * 1000:.1f}ms, mean {async_mean * 1000:.1f}ms"
+        )
+        print(f"COPY:     best {copy_best * 1000:.1f}ms, mean {copy_mean * 1000:.1f}ms")
+
+        results.append(
+            {
+                "Dataset": name,
+                "Rows": len(fetchall_df),
+                "Fetchall Best (ms)": round(fetchall_best * 1000, 2),
+                "Fetchall Mean (ms)": round(fetchall_mean * 1000, 2),
+                "Async Best (ms)": round(async_best * 1000, 2),
+                "Async Mean (ms)": round(async_mean * 1000, 2),
+                "COPY Best (ms)": round(copy_best * 1000, 2),
+                "COPY Mean (ms)": round(copy_mean * 1000, 2),
+                "Speedup": round(fetchall_best / copy_best, 2) if copy_best else None,
+                "Results Match": frames_match(fetchall_df, copy_df)
+                and frames_match(fetchall_df, async_df),
+            }
+        )
+
+    metrics_filename = "csv_exports/benchmarks/copy_vs_fetchall.csv"
+    os.makedirs(os.path.dirname(metrics_filename), exist_ok=True)
+    export_evaluation_metrics_to_csv(results, metrics_filename)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,493 @@
+import os
+import time
+
+from sqlmodel import text
+
+from apps.utils.coverage import DATASETS, CoverageWindow, coverage_query
+from apps.utils.csv_export import export_evaluation_metrics_to_csv
+from apps.utils.database import get_session
+
+WINDOWS = {
+    "last 6 months": CoverageWindow.last(6),
+    "custom months": CoverageWindow.custom(["2023-12", "2024-01", "2025-03"]),
+}
+
+SOURCE_FILTERS = {
+    "OTA": ["Expedia TravelAds"],
+    "metaSearch": ["Trivago", "Kayak"],
+    "sponsoredListing": ["Kayak Sponsored Listing"],
+}
+
+
+# The SQL of each dataset's custom_month_missing_data.py as it was before the
+# coverage engine, copied verbatim. The paid-media scripts filled
+# {source_filter_sql} from their source_filter argument
+LEGACY_SQL = {
+    # apps/scripts/brandDotCom/missingData/TRD/custom_month_missing_data.py
+    "TRD": """
+    WITH months AS (
+        SELECT TO_DATE(m, 'YYYY-MM-DD') AS month_start
+        FROM UNNEST(:month_list) AS m
+    ),
+    active_hotels AS (
+        SELECT id AS hotel_id, code AS hotel_code
+        FROM public.hotel
+        WHERE is_active = true
+    ),
+    hotel_month_combinations AS (
+        SELECT h.hotel_id, h.hotel_code, m.month_start
+        FROM active_hotels h
+        CROSS JOIN months m
+    ),
+    top_ref_aggregated AS (
+        SELECT
+            hotel_id,
+            DATE_TRUNC('month', date) AS month_start,
+            COALESCE(SUM(visits), 0) AS total_visits,
+            COALESCE(SUM(booking), 0) AS total_bookings,
+            COALESCE(SUM(room_nights), 0) AS total_room_nights,
+            COALESCE(SUM(revenue), 0) AS total_revenue
+        FROM public.top_ref_domain
+        WHERE date >= (SELECT MIN(month_start) FROM months)
+          AND date < (SELECT MAX(month_start) + INTERVAL '1 month' FROM months)
+        GROUP BY hotel_id, DATE_TRUNC('month', date)
+    ),
+    missing_data AS (
+        SELECT hmc.hotel_code, TO_CHAR(hmc.month_start, 'YYYY-MM') AS month
+        FROM hotel_month_combinations hmc
+        LEFT JOIN top_ref_aggregated tra
+          ON hmc.hotel_id = tra.hotel_id AND hmc.month_start = tra.month_start
+        WHERE tra.hotel_id IS NULL
+           OR (
+               tra.total_visits = 0 AND
+               tra.total_bookings = 0 AND
+               tra.total_room_nights = 0 AND
+               tra.total_revenue = 0
+           )
+    )
+    SELECT *
+    FROM missing_data
+    ORDER BY hotel_code, month;
+    """,
+    # apps/scripts/brandDotCom/missingData/channelMix/custom_month_missing_data.py
+    "channelMix": """
+        WITH months AS (
+            SELECT TO_DATE(m, 'YYYY-MM-DD') AS month_start
+            FROM UNNEST(:month_list) AS m
+        ),
+        active_hotels AS (
+            SELECT id AS hotel_id, code AS hotel_code
+            FROM public.hotel
+            WHERE is_active = true
+        ),
+        hotel_month_combinations AS (
+            SELECT h.hotel_id, h.hotel_code, m.month_start
+            FROM active_hotels h
+            CROSS JOIN months m
+        ),
+        channel_mix_grouped AS (
+            SELECT hotel_id, DATE_TRUNC('month', date) AS month_start
+            FROM public.channel_mix
+            GROUP BY hotel_id, DATE_TRUNC('month', date)
+        ),
+        missing_data AS (
+            SELECT hmc.hotel_code, TO_CHAR(hmc.month_start, 'YYYY-MM') AS month
+            FROM hotel_month_combinations hmc
+            LEFT JOIN channel_mix_grouped cmg
+              ON hmc.hotel_id = cmg.hotel_id AND hmc.month_start = cmg.month_start
+            WHERE cmg.hotel_id IS NULL
+        )
+        SELECT * FROM missing_data
+        ORDER BY hotel_code, month;
+        """,
+    # apps/scripts/brandDotCom/missingData/sourceTraffic/custom_month_missing_data.py
+    "sourceTraffic": """
+        WITH months AS (
+            SELECT TO_DATE(m, 'YYYY-MM-DD') AS month_start
+            FROM UNNEST(:month_list) AS m
+        ),
+        active_hotels AS (
+            SELECT id AS hotel_id, code AS hotel_code
+            FROM public.hotel
+            WHERE is_active = true
+        ),
+        hotel_month_combinations AS (
+            SELECT h.hotel_id, h.hotel_code, m.month_start
+            FROM active_hotels h
+            CROSS JOIN months m
+        ),
+        source_traffic_aggregated AS (
+            SELECT
+                hotel_id,
+                DATE_TRUNC('month', date) AS month_start,
+                COALESCE(SUM(visits), 0) AS total_visits,
+                COALESCE(SUM(revenue), 0) AS total_revenue
+            FROM public.source_traffic
+            WHERE DATE_TRUNC('month', date) IN (
+                SELECT month_start FROM months
+            )
+            GROUP BY hotel_id, DATE_TRUNC('month', date)
+        ),
+        missing_data AS (
+            SELECT hmc.hotel_code, TO_CHAR(hmc.month_start, 'YYYY-MM') AS month
+            FROM hotel_month_combinations hmc
+            LEFT JOIN source_traffic_aggregated sta
+              ON hmc.hotel_id = sta.hotel_id AND hmc.month_start = sta.month_start
+            WHERE sta.hotel_id IS NULL
+               OR (sta.total_visits = 0 AND sta.total_revenue = 0)
+        )
+        SELECT * FROM missing_data
+        ORDER BY hotel_code, month;
+        """,
+    # apps/scripts/brandDotCom/missingData/visitsAndRevenue/custom_month_missing_data.py
+    "VNR": """
+        WITH months AS (
+            SELECT TO_DATE(m, 'YYYY-MM-DD') AS month_start
+            FROM UNNEST(:month_list) AS m
+        ),
+        active_hotels AS (
+            SELECT id AS hotel_id, code AS hotel_code
+            FROM public.hotel
+            WHERE is_active = true
+        ),
+        hotel_month_combinations AS (
+            SELECT h.hotel_id, h.hotel_code, m.month_start
+            FROM active_hotels h
+            CROSS JOIN months m
+        ),
+        visit_revenue_aggregated AS (
+            SELECT
+                hotel_id,
+                DATE_TRUNC('month', date) AS month_start,
+                COALESCE(SUM(traffic), 0) AS total_traffic,
+                COALESCE(SUM(revenue), 0) AS total_revenue
+            FROM public.visit_revenue
+            WHERE date >= (SELECT MIN(month_start) FROM months)
+              AND date < (SELECT MAX(month_start) + INTERVAL '1 month' FROM months)
+            GROUP BY hotel_id, DATE_TRUNC('month', date)
+        ),
+        missing_data AS (
+            SELECT hmc.hotel_code, TO_CHAR(hmc.month_start, 'YYYY-MM') AS month
+            FROM hotel_month_combinations hmc
+            LEFT JOIN visit_revenue_aggregated vra
+              ON hmc.hotel_id = vra.hotel_id AND hmc.month_start = vra.month_start
+            WHERE vra.hotel_id IS NULL
+               OR (vra.total_traffic = 0 AND vra.total_revenue = 0)
+        )
+        SELECT * FROM missing_data
+        ORDER BY hotel_code, month;
+        """,
+    # apps/scripts/paidMedia/missingData/OTA/custom_month_missing_data.py
+    "OTA": """
+        WITH months AS (
+            SELECT TO_DATE(m, 'YYYY-MM-DD') AS month_start
+            FROM UNNEST(:month_list) AS m
+        ),
+        active_hotels AS (
+            SELECT id AS hotel_id, code AS hotel_code
+            FROM public.hotel
+            WHERE is_active = true
+        ),
+        hotel_month_combinations AS (
+            SELECT h.hotel_id, h.hotel_code, m.month_start
+            FROM active_hotels h
+            CROSS JOIN months m
+        ),
+        ota_paid_media AS (
+            SELECT
+                pm.hotel_id,
+                DATE_TRUNC('month', pm.date) AS month_start,
+                COUNT(*) AS ota_entries
+            FROM public.paid_media pm
+            JOIN public.media_channel mc ON pm.media_id = mc.id
+            LEFT JOIN public.paid_media_source pms ON pm.paid_media_source_id = pms.id
+            WHERE mc.name = 'OTA'
+            {source_filter_sql}
+              AND DATE_TRUNC('month', pm.date) IN (
+                  SELECT month_start FROM months
+              )
+            GROUP BY pm.hotel_id, DATE_TRUNC('month', pm.date)
+        ),
+        missing_data AS (
+            SELECT hmc.hotel_code, TO_CHAR(hmc.month_start, 'YYYY-MM') AS month
+            FROM hotel_month_combinations hmc
+            LEFT JOIN ota_paid_media ms
+              ON hmc.hotel_id = ms.hotel_id AND hmc.month_start = ms.month_start
+            WHERE ms.ota_entries IS NULL
+        )
+        SELECT * FROM missing_data
+        ORDER BY hotel_code, month;
+        """,
+    # apps/scripts/paidMedia/missingData/displayAds/custom_month_missing_data.py
+    "displayAds": """
+        WITH months AS (
+            SELECT TO_DATE(m, 'YYYY-MM-DD') AS month_start
+            FROM UNNEST(:month_list) AS m
+        ),
+        active_hotels AS (
+            SELECT id AS hotel_id, code AS hotel_code
+            FROM public.hotel
+            WHERE is_active = true
+        ),
+        hotel_month_combinations AS (
+            SELECT h.hotel_id, h.hotel_code, m.month_start
+            FROM active_hotels h
+            CROSS JOIN months m
+        ),
+        display_ads_paid_media AS (
+            SELECT
+                hotel_id,
+                DATE_TRUNC('month', date) AS month_start,
+                COUNT(*) AS display_ads_entries
+            FROM public.paid_media pm
+            JOIN public.media_channel mc ON pm.media_id = mc.id
+            WHERE mc.name = 'DISPLAY ADS'
+              AND DATE_TRUNC('month', date) IN (
+                  SELECT month_start FROM months
+              )
+            GROUP BY hotel_id, DATE_TRUNC('month', date)
+        ),
+        missing_data AS (
+            SELECT hmc.hotel_code, TO_CHAR(hmc.month_start, 'YYYY-MM') AS month
+            FROM hotel_month_combinations hmc
+            LEFT JOIN display_ads_paid_media ms
+              ON hmc.hotel_id = ms.hotel_id AND hmc.month_start = ms.month_start
+            WHERE ms.display_ads_entries IS NULL
+        )
+        SELECT * FROM missing_data
+        ORDER BY hotel_code, month;
+        """,
+    # apps/scripts/paidMedia/missingData/metaSearch/custom_month_missing_data.py
+    "metaSearch": """
+        WITH months AS (
+            SELECT TO_DATE(m, 'YYYY-MM-DD') AS month_start
+            FROM UNNEST(:month_list) AS m
+        ),
+        active_hotels AS (
+            SELECT id AS hotel_id, code AS hotel_code
+            FROM public.hotel
+            WHERE is_active = true
+        ),
+        hotel_month_combinations AS (
+            SELECT h.hotel_id, h.hotel_code, m.month_start
+            FROM active_hotels h
+            CROSS JOIN months m
+        ),
+        meta_search_paid_media AS (
+            SELECT
+                pm.hotel_id,
+                DATE_TRUNC('month', pm.date) AS month_start,
+                COUNT(*) AS meta_entries
+            FROM public.paid_media pm
+            JOIN public.media_channel mc ON pm.media_id = mc.id
+            LEFT JOIN public.paid_media_source pms ON pm.paid_media_source_id = pms.id
+            WHERE mc.name = 'METASEARCH'
+              {source_filter_sql}
+              AND DATE_TRUNC('month', pm.date) IN (
+                  SELECT month_start FROM months
+              )
+            GROUP BY pm.hotel_id, DATE_TRUNC('month', pm.date)
+        ),
+        missing_data AS (
+            SELECT hmc.hotel_code, TO_CHAR(hmc.month_start, 'YYYY-MM') AS month
+            FROM hotel_month_combinations hmc
+            LEFT JOIN meta_search_paid_media ms
+              ON hmc.hotel_id = ms.hotel_id AND hmc.month_start = ms.month_start
+            WHERE ms.meta_entries IS NULL
+        )
+        SELECT * FROM missing_data
+        ORDER BY hotel_code, month;
+        """,
+    # apps/scripts/paidMedia/missingData/paidSearch/custom_month_missing_data.py
+    "paidSearch": """
+        WITH months AS (
+            SELECT TO_DATE(m, 'YYYY-MM-DD') AS month_start
+            FROM UNNEST(:month_list) AS m
+        ),
+        active_hotels AS (
+            SELECT id AS hotel_id, code AS hotel_code
+            FROM public.hotel
+            WHERE is_active = true
+        ),
+        hotel_month_combinations AS (
+            SELECT h.hotel_id, h.hotel_code, m.month_start
+            FROM active_hotels h
+            CROSS JOIN months m
+        ),
+        paid_search_paid_media AS (
+            SELECT
+                hotel_id,
+                DATE_TRUNC('month', date) AS month_start,
+                COUNT(*) AS paid_search_entries
+            FROM public.paid_media pm
+            JOIN public.media_channel mc ON pm.media_id = mc.id
+            WHERE mc.name = 'PAID SEARCH'
+              AND DATE_TRUNC('month', date) IN (
+                  SELECT month_start FROM months
+              )
+            GROUP BY hotel_id, DATE_TRUNC('month', date)
+        ),
+        missing_data AS (
+            SELECT hmc.hotel_code, TO_CHAR(hmc.month_start, 'YYYY-MM') AS month
+            FROM hotel_month_combinations hmc
+            LEFT JOIN paid_search_paid_media ms
+              ON hmc.hotel_id = ms.hotel_id AND hmc.month_start = ms.month_start
+            WHERE ms.paid_search_entries IS NULL
+        )
+        SELECT * FROM missing_data
+        ORDER BY hotel_code, month;
+        """,
+    # apps/scripts/paidMedia/missingData/paidSocial/custom_month_missing_data.py
+    "paidSocial": """
+        WITH months AS (
+            SELECT TO_DATE(m, 'YYYY-MM-DD') AS month_start
+            FROM UNNEST(:month_list) AS m
+        ),
+        active_hotels AS (
+            SELECT id AS hotel_id, code AS hotel_code
+            FROM public.hotel
+            WHERE is_active = true
+        ),
+        hotel_month_combinations AS (
+            SELECT h.hotel_id, h.hotel_code, m.month_start
+            FROM active_hotels h
+            CROSS JOIN months m
+        ),
+        paid_social_paid_media AS (
+            SELECT
+                hotel_id,
+                DATE_TRUNC('month', date) AS month_start,
+                COUNT(*) AS paid_social_entries
+            FROM public.paid_media pm
+            JOIN public.media_channel mc ON pm.media_id = mc.id
+            WHERE mc.name = 'PAID SOCIAL'
+              AND DATE_TRUNC('month', date) IN (
+                  SELECT month_start FROM months
+              )
+            GROUP BY hotel_id, DATE_TRUNC('month', date)
+        ),
+        missing_data AS (
+            SELECT hmc.hotel_code, TO_CHAR(hmc.month_start, 'YYYY-MM') AS month
+            FROM hotel_month_combinations hmc
+            LEFT JOIN paid_social_paid_media ms
+              ON hmc.hotel_id = ms.hotel_id AND hmc.month_start = ms.month_start
+            WHERE ms.paid_social_entries IS NULL
+        )
+        SELECT * FROM missing_data
+        ORDER BY hotel_code, month;
+        """,
+    # apps/scripts/paidMedia/missingData/sponsoredListing/custom_month_missing_data.py
+    "sponsoredListing": """
+        WITH months AS (
+            SELECT TO_DATE(m, 'YYYY-MM-DD') AS month_start
+            FROM UNNEST(:month_list) AS m
+        ),
+        active_hotels AS (
+            SELECT id AS hotel_id, code AS hotel_code
+            FROM public.hotel
+            WHERE is_active = true
+        ),
+        hotel_month_combinations AS (
+            SELECT h.hotel_id, h.hotel_code, m.month_start
+            FROM active_hotels h
+            CROSS JOIN months m
+        ),
+        sponsored_listing_paid_media AS (
+            SELECT
+                pm.hotel_id,
+                DATE_TRUNC('month', pm.date) AS month_start,
+                COUNT(*) AS sponsored_listing_entries
+            FROM public.paid_media pm
+            JOIN public.media_channel mc ON pm.media_id = mc.id
+            LEFT JOIN public.paid_media_source pms ON pm.paid_media_source_id = pms.id
+            WHERE mc.name = 'SPONSORED LISTING'
+                {source_filter_sql}
+              AND DATE_TRUNC('month', pm.date) IN (
+                  SELECT month_start FROM months
+              )
+            GROUP BY pm.hotel_id, DATE_TRUNC('month', pm.date)
+        ),
+        missing_data AS (
+            SELECT hmc.hotel_code, TO_CHAR(hmc.month_start, 'YYYY-MM') AS month
+            FROM hotel_month_combinations hmc
+            LEFT JOIN sponsored_listing_paid_media ms
+              ON hmc.hotel_id = ms.hotel_id AND hmc.month_start = ms.month_start
+            WHERE ms.sponsored_listing_entries IS NULL
+        )
+        SELECT * FROM missing_data
+        ORDER BY hotel_code, month;
+        """,
+}
+
+
+def legacy_query(name, sources=None):
+    # Same construction as the original scripts' source_filter_sql
+    source_filter_sql = ""
+    if sources:
+        source_placeholders = ", ".join([f"'{src}'" for src in sources])
+        source_filter_sql = f"AND pms.normalized_source IN ({source_placeholders})"
+    return text(LEGACY_SQL[name].replace("{source_filter_sql}", source_filter_sql))
+
+
+def legacy_params(window):
+    return {"month_list": [f"{m}-01" for m in window.months]}
+
+
+def timed_rows(query, params):
+    # Straight to the database: the result cache would hide both timings
+    start = time.perf_counter()
+    with get_session() as session:
+        rows = [tuple(row) for row in session.execute(query, params).fetchall()]
+    return rows, time.perf_counter() - start
+
+
+def main():
+    results = []
+    mismatches = 0
+
+    for window_name, window in WINDOWS.items():
+        for name, spec in DATASETS.items():
+            sources = SOURCE_FILTERS.get(name)
+            for filtered in (False, True) if sources else (False,):
+                query, params = coverage_query(
+                    spec, window, sources if filtered else None
+                )
+                legacy_rows, legacy_time = timed_rows(
+                    legacy_query(name, sources if filtered else None),
+                    legacy_params(window),
+                )
+                rows, range_time = timed_rows(query, params)
+                match = legacy_rows == rows
+                mismatches += not match
+
+                label = f"{name} (filtered)" if filtered else name
+                status = "OK" if match else "MISMATCH"
+                print(
+                    f"[{status}] {window_name} / {label}: {len(rows)} rows, "
+                    f"original {legacy_time * 1000:.1f}ms, "
+                    f"ranges {range_time * 1000:.1f}ms"
+                )
+                results.append(
+                    {
+                        "Window": window_name,
+                        "Dataset": label,
+                        "Legacy Rows": len(legacy_rows),
+                        "Range Rows": len(rows),
+                        "Results Match": match,
+                        "Legacy (ms)": round(legacy_time * 1000, 2),
+                        "Ranges (ms)": round(range_time * 1000, 2),
+                    }
+                )
+
+    if mismatches:
+        print(f"[WARN] {mismatches} coverage queries differ from the original scripts")
+    else:
+        print("[INFO] All coverage queries match the original scripts")
+
+    metrics_filename = "csv_exports/benchmarks/coverage_parity.csv"
+    os.makedirs(os.path.dirname(metrics_filename), exist_ok=True)
+    export_evaluation_metrics_to_csv(results, metrics_filename)
+
+
+if __name__ == "__main__":
+    main()
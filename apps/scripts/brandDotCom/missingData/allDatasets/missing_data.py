@@ -0,0 +1,55 @@
+import os
+from apps.utils.coverage import (
+    CoverageWindow,
+    find_brand_coverage,
+    find_brand_coverage_async,
+)
+from apps.utils.database import QueryTimeoutError
+from apps.utils.csv_export import export_evaluation_metrics_to_csv
+
+
+def get_brand_coverage(month_list=None, incomplete_only=True):
+    # month_list=None checks the last 6 months
+    window = CoverageWindow.custom(month_list) if month_list else CoverageWindow.last(6)
+    return find_brand_coverage(window, incomplete_only=incomplete_only)
+
+
+async def get_brand_coverage_async(month_list=None, incomplete_only=True):
+    window = CoverageWindow.custom(month_list) if month_list else CoverageWindow.last(6)
+    return await find_brand_coverage_async(window, incomplete_only=incomplete_only)
+
+
+def main():
+    custom_months = None  # e.g. ["2023-12", "2024-01", "2025-03"]
+
+    try:
+        rows = get_brand_coverage(custom_months)
+    except QueryTimeoutError as error:
+        print(f"[TIMEOUT] {error}")
+        return
+
+    if not rows:
+        print("All active hotels have TRD, VNR, SourceTraffic and ChannelMix data.")
+        return
+
+    print("Hotel-months with missing or zero brand.com data:\n")
+    results = []
+    for row in rows:
+        status = dict(row._mapping)
+        print(
+            f"Hotel Code: {row.hotel_code}, Month: {row.month}, "
+            f"TRD: {row.top_ref_domain}, VNR: {row.visit_revenue}, "
+            f"ST: {row.source_traffic}, CM: {row.channel_mix}"
+        )
+        results.append(status)
+
+    folder = "customMonths" if custom_months else "lastXmonths"
+    filename = (
+        f"csv_exports/brandDotCom/missingData/allDatasets/{folder}/coverage_status.csv"
+    )
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    export_evaluation_metrics_to_csv(results, filename)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,13 @@
 import pandas as pd
-from apps.utils.database import get_session
+from apps.utils.baselines import screen_series
+from apps.utils.bulk_forecast import (
+    ALL_HOTELS,
+    fetch_all_hotels_series,
+    forecast_partitions,
+)
+from apps.utils.model_cache import fit_predict_cached
+from apps.utils.parallel_fit import FIT_WORKERS, fit_in_parallel
+from apps.utils.rollups import fetch_series
 from sqlalchemy import text
 from prophet import Prophet
 from sklearn.metrics import mean_absolute_error, mean_squared_error
@@ -9,29 +17,32 @@ import os
 import re
 
 
-def fetch_all_hotel_data(hotel_code: str) -> pd.DataFrame:
-    query = """
-        SELECT
-            h.code AS hotel_code,
-            domain AS domain_name,
-            DATE_TRUNC('month', trd.date) AS month,
-            SUM(trd.room_nights) AS room_nights
-        FROM public.top_ref_domain trd
-        JOIN public.hotel h ON trd.hotel_id = h.id
-        JOIN public.source domain ON trd.domain = domain
-        WHERE trd.date >= DATE_TRUNC('month', CURRENT_DATE) - INTERVAL '36 month'
-          AND trd.date < DATE_TRUNC('month', CURRENT_DATE)
-          AND h.code = :hotel_code
-          AND h.is_active = TRUE
-        GROUP BY h.code, domain, DATE_TRUNC('month', trd.date)
-        ORDER BY h.code, domain, month
+query = text(
     """
-    with get_session() as session:
-        result = session.execute(text(query), {"hotel_code": hotel_code})
-        df = pd.DataFrame(
-            result.fetchall(), columns=["hotel_code", "domain", "ds", "y"]
-        )
-    return df
+    SELECT
+        h.code AS hotel_code,
+        domain AS domain_name,
+        DATE_TRUNC('month', trd.date) AS month,
+        SUM(trd.room_nights) AS room_nights
+    FROM public.top_ref_domain trd
+    JOIN public.hotel h ON trd.hotel_id = h.id
+    JOIN public.source domain ON trd.domain = domain
+    WHERE trd.date >= DATE_TRUNC('month', CURRENT_DATE) - INTERVAL '36 month'
+      AND trd.date < DATE_TRUNC('month', CURRENT_DATE)
+      AND (CAST(:hotel_code AS TEXT) IS NULL OR h.code = :hotel_code)
+      AND h.is_active = TRUE
+    GROUP BY h.code, domain, DATE_TRUNC('month', trd.date)
+    ORDER BY h.code, domain, month
+    """
+)
+columns = ["hotel_code", "domain", "ds", "y"]
+rollup = ("top_ref_domain", "room_nights")
+prophet_config = {"yearly_seasonality": True}
+
+
+def fetch_all_hotel_data(hotel_code: str) -> pd.DataFrame:
+    # From the monthly rollup while it is fresh, else from `query`
+    return fetch_series(query, columns, rollup, hotel_code)
 
 
 def generate_forecast(df_domain: pd.DataFrame) -> tuple:
@@ -46,13 +57,14 @@ def generate_forecast(df_domain: pd.DataFrame) -> tuple:
     train = df_domain.iloc[:split_index]
     test = df_domain.iloc[split_index:]
 
-    # Fit on full data
-    model = Prophet(yearly_seasonality=True)
-    model.fit(df_domain)
-
-    # Predict on same data points
-    future = df_domain[["ds"]].copy()
-    forecast = model.predict(future)
+    # Fit on full data, predict on the same data points; unchanged series
+    # reuse the cached model and forecast
+    model, forecast = fit_predict_cached(
+        "TRD/room_nights",
+        df_domain,
+        lambda model: df_domain[["ds"]].copy(),
+        prophet_config,
+    )
 
     # Clip yhat to observed bounds
     y_min, y_max = df_domain["y"].min(), df_domain["y"].max()
@@ -154,7 +166,24 @@ def forecast_and_plot(
     plot_forecast(model, forecast, df_domain, test, hotel_code, domain, output_dir)
 
 
-def main():
+def forecast_all_hotels(workers: int = FIT_WORKERS):
+    # Every active hotel's domains from one query instead of one per hotel;
+    # series a baseline already forecasts well skip Prophet
+    forecast_partitions(
+        forecast_and_plot,
+        fetch_all_hotels_series(query, columns, rollup),
+        ["hotel_code", "domain"],
+        lambda key, frame: (frame, *key, f"forecast_plots/TRD/RoomNights/{key[0]}"),
+        workers,
+        screen=True,
+    )
+
+
+def main(workers: int = FIT_WORKERS):
+    if ALL_HOTELS:
+        forecast_all_hotels(workers)
+        return
+
     hotel_code = "BOSFRUP"
     df = fetch_all_hotel_data(hotel_code)
     if df.empty:
@@ -166,10 +195,20 @@ def main():
     for hotel_code, hotel_df in grouped:
         print(f"\n=== Processing {hotel_code} ===")
         output_dir = f"forecast_plots/TRD/RoomNights/{hotel_code}"
-
-        for domain in hotel_df["domain"].unique():
-            df_domain = hotel_df[hotel_df["domain"] == domain].copy()
-            forecast_and_plot(df_domain, hotel_code, domain, output_dir)
+        # Series a baseline already forecasts well skip Prophet
+        hotel_df = screen_series(hotel_df, ["hotel_code", "domain"])
+
+        # One task per domain; fits run in worker processes when workers > 1
+        tasks = [
+            (
+                hotel_df[hotel_df["domain"] == domain].copy(),
+                hotel_code,
+                domain,
+                output_dir,
+            )
+            for domain in hotel_df["domain"].unique()
+        ]
+        fit_in_parallel(forecast_and_plot, tasks, workers)
 
 
 if __name__ == "__main__":
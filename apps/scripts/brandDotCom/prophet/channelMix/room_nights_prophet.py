@@ -1,5 +1,12 @@
 import pandas as pd
-from apps.utils.database import get_session
+from apps.utils.bulk_forecast import (
+    ALL_HOTELS,
+    fetch_all_hotels_series,
+    forecast_partitions,
+)
+from apps.utils.model_cache import fit_predict_cached
+from apps.utils.parallel_fit import FIT_WORKERS, fit_in_parallel
+from apps.utils.rollups import fetch_series
 from sqlalchemy import text
 from prophet import Prophet
 from sklearn.metrics import mean_absolute_error, mean_squared_error
@@ -11,29 +18,32 @@ import re
 from apps.utils.csv_export import export_evaluation_metrics_to_csv
 
 
-def fetch_all_hotel_data(hotel_code: str) -> pd.DataFrame:
-    query = """
-       SELECT
-            h.code AS hotel_code,
-            ct.name AS channel_type,
-            DATE_TRUNC('month', cm.date) AS month,
-            SUM(cm.room_nights) AS room_nights
-        FROM public.channel_mix cm
-        JOIN public.hotel h ON cm.hotel_id = h.id
-        JOIN public.channel_type ct ON cm.channel_type_id = ct.id
-        WHERE cm.date >= DATE_TRUNC('month', CURRENT_DATE) - INTERVAL '36 month'
-        AND cm.date < DATE_TRUNC('month', CURRENT_DATE)
-        AND h.code = :hotel_code
-        AND h.is_active = TRUE
-        GROUP BY h.code, ct.name, DATE_TRUNC('month', cm.date)
-        ORDER BY ct.name, month
+query = text(
     """
-    with get_session() as session:
-        result = session.execute(text(query), {"hotel_code": hotel_code})
-        df = pd.DataFrame(
-            result.fetchall(), columns=["hotel_code", "channel_type", "ds", "y"]
-        )
-    return df
+    SELECT
+        h.code AS hotel_code,
+        ct.name AS channel_type,
+        DATE_TRUNC('month', cm.date) AS month,
+        SUM(cm.room_nights) AS room_nights
+    FROM public.channel_mix cm
+    JOIN public.hotel h ON cm.hotel_id = h.id
+    JOIN public.channel_type ct ON cm.channel_type_id = ct.id
+    WHERE cm.date >= DATE_TRUNC('month', CURRENT_DATE) - INTERVAL '36 month'
+    AND cm.date < DATE_TRUNC('month', CURRENT_DATE)
+    AND (CAST(:hotel_code AS TEXT) IS NULL OR h.code = :hotel_code)
+    AND h.is_active = TRUE
+    GROUP BY h.code, ct.name, DATE_TRUNC('month', cm.date)
+    ORDER BY h.code, ct.name, month
+    """
+)
+columns = ["hotel_code", "channel_type", "ds", "y"]
+rollup = ("channel_mix", "room_nights")
+prophet_config = {"yearly_seasonality": True}
+
+
+def fetch_all_hotel_data(hotel_code: str) -> pd.DataFrame:
+    # From the monthly rollup while it is fresh, else from `query`
+    return fetch_series(query, columns, rollup, hotel_code)
 
 
 def generate_forecast(df_channel: pd.DataFrame) -> tuple:
@@ -48,13 +58,14 @@ def generate_forecast(df_channel: pd.DataFrame) -> tuple:
     train = df_channel.iloc[:split_index]
     test = df_channel.iloc[split_index:]
 
-    # Fit on full data
-    model = Prophet(yearly_seasonality=True)
-    model.fit(df_channel)
-
-    # Predict on same data points
-    future = df_channel[["ds"]].copy()
-    forecast = model.predict(future)
+    # Fit on full data, predict on the same data points; unchanged series
+    # reuse the cached model and forecast
+    model, forecast = fit_predict_cached(
+        "channelMix/room_nights",
+        df_channel,
+        lambda model: df_channel[["ds"]].copy(),
+        prophet_config,
+    )
 
     # Clip yhat to observed bounds
     y_min, y_max = df_channel["y"].min(), df_channel["y"].max()
@@ -155,8 +166,39 @@ def forecast_and_plot(
 
     plot_forecast(model, forecast, df_channel, test, hotel_code, channel, output_dir)
 
+    return {
+        "Hotel Code": hotel_code,
+        "Channel Type": channel,
+        "MAE": round(mae, 2),
+        "RMSE": round(rmse, 2),
+        "MAPE (%)": round(mape, 2),
+    }
+
+
+def forecast_all_hotels(workers: int = FIT_WORKERS):
+    # Every active hotel's channels from one query instead of one per hotel
+    results = forecast_partitions(
+        forecast_and_plot,
+        fetch_all_hotels_series(query, columns, rollup),
+        ["hotel_code", "channel_type"],
+        lambda key, frame: (
+            frame,
+            *key,
+            f"forecast_plots/channelMix/RoomNights/{key[0]}",
+        ),
+        workers,
+    )
+
+    metrics_filename = "csv_exports/brandDotCom/prophet/channelMix/room_nights/all_hotels/evaluation_metrics.csv"
+    os.makedirs(os.path.dirname(metrics_filename), exist_ok=True)
+    export_evaluation_metrics_to_csv([row for row in results if row], metrics_filename)
+
+
+def main(workers: int = FIT_WORKERS):
+    if ALL_HOTELS:
+        forecast_all_hotels(workers)
+        return
 
-def main():
     hotel_code = "BOSFRUP"
     df = fetch_all_hotel_data(hotel_code)
     if df.empty:
@@ -170,39 +212,18 @@ def main():
         print(f"\n=== Processing {hotel_code} ===")
         output_dir = f"forecast_plots/channelMix/RoomNights/{hotel_code}"
 
-        for channel in hotel_df["channel_type"].unique():
-            df_channel = hotel_df[hotel_df["channel_type"] == channel].copy()
-            model, forecast, train, test, df_channel = generate_forecast(df_channel)
-
-            if model is None:
-                print(f"Skipping {hotel_code} - {channel} (not enough data)")
-                continue
-
-            metrics = evaluate_forecast(df_channel, model, forecast, test)
-            if not metrics:
-                print(
-                    f"Skipping {hotel_code} - {channel} (no overlapping forecast/test data)"
-                )
-                continue
-
-            mae, rmse, mape = metrics
-            print(f"\n{hotel_code} - {channel}")
-            print(f"MAE: {mae:.2f}, RMSE: {rmse:.2f}, MAPE: {mape:.2f}%")
-
-            # Collect metrics for export
-            all_metrics.append(
-                {
-                    "Hotel Code": hotel_code,
-                    "Channel Type": channel,
-                    "MAE": round(mae, 2),
-                    "RMSE": round(rmse, 2),
-                    "MAPE (%)": round(mape, 2),
-                }
-            )
-
-            plot_forecast(
-                model, forecast, df_channel, test, hotel_code, channel, output_dir
+        # One task per channel; fits run in worker processes when workers > 1
+        tasks = [
+            (
+                hotel_df[hotel_df["channel_type"] == channel].copy(),
+                hotel_code,
+                channel,
+                output_dir,
             )
+            for channel in hotel_df["channel_type"].unique()
+        ]
+        results = fit_in_parallel(forecast_and_plot, tasks, workers)
+        all_metrics.extend(row for row in results if row)
 
     metrics_filename = f"csv_exports/brandDotCom/prophet/channelMix/room_nights/{hotel_code}/evaluation_metrics.csv"
     os.makedirs(os.path.dirname(metrics_filename), exist_ok=True)
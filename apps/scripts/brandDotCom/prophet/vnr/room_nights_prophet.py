@@ -1,5 +1,12 @@
 import pandas as pd
-from apps.utils.database import get_session
+from apps.utils.bulk_forecast import (
+    ALL_HOTELS,
+    fetch_all_hotels_series,
+    forecast_partitions,
+)
+from apps.utils.model_cache import fit_predict_cached
+from apps.utils.parallel_fit import FIT_WORKERS, fit_in_parallel
+from apps.utils.rollups import fetch_series
 from sqlalchemy import text
 from prophet import Prophet
 from sklearn.metrics import mean_absolute_error, mean_squared_error
@@ -7,27 +14,33 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.ticker as ticker
 import os
+from typing import List
 
 
-def fetch_vnr_data(hotel_code: str) -> pd.DataFrame:
-    query = """
-        SELECT
-            h.code AS hotel_code,
-            DATE_TRUNC('month', vnr.date) AS month,
-            SUM(vnr.room_nights) AS room_nights
-        FROM public.visit_revenue vnr
-        JOIN public.hotel h ON vnr.hotel_id = h.id
-        WHERE vnr.date >= DATE_TRUNC('month', CURRENT_DATE) - INTERVAL '36 month'
-        AND vnr.date < DATE_TRUNC('month', CURRENT_DATE)
-        AND h.code = :hotel_code
-        AND h.is_active = TRUE
-        GROUP BY h.code, DATE_TRUNC('month', vnr.date)
-        ORDER BY month
+query = text(
+    """
+    SELECT
+        h.code AS hotel_code,
+        DATE_TRUNC('month', vnr.date) AS month,
+        SUM(vnr.room_nights) AS room_nights
+    FROM public.visit_revenue vnr
+    JOIN public.hotel h ON vnr.hotel_id = h.id
+    WHERE vnr.date >= DATE_TRUNC('month', CURRENT_DATE) - INTERVAL '36 month'
+    AND vnr.date < DATE_TRUNC('month', CURRENT_DATE)
+    AND (CAST(:hotel_code AS TEXT) IS NULL OR h.code = :hotel_code)
+    AND h.is_active = TRUE
+    GROUP BY h.code, DATE_TRUNC('month', vnr.date)
+    ORDER BY h.code, month
     """
-    with get_session() as session:
-        result = session.execute(text(query), {"hotel_code": hotel_code})
-        df = pd.DataFrame(result.fetchall(), columns=["hotel_code", "ds", "y"])
-    return df
+)
+columns = ["hotel_code", "ds", "y"]
+rollup = ("visit_revenue", "room_nights")
+prophet_config = {"yearly_seasonality": True}
+
+
+def fetch_vnr_data(hotel_code: str) -> pd.DataFrame:
+    # From the monthly rollup while it is fresh, else from `query`
+    return fetch_series(query, columns, rollup, hotel_code)
 
 
 def generate_forecast(df: pd.DataFrame) -> tuple:
@@ -42,12 +55,11 @@ def generate_forecast(df: pd.DataFrame) -> tuple:
     train = df.iloc[:split_index]
     test = df.iloc[split_index:]
 
-    # Fit full data
-    model = Prophet(yearly_seasonality=True)
-    model.fit(df)
-
-    future = df[["ds"]].copy()
-    forecast = model.predict(future)
+    # Fit full data, predict on the same data points; unchanged series
+    # reuse the cached model and forecast
+    model, forecast = fit_predict_cached(
+        "vnr/room_nights", df, lambda model: df[["ds"]].copy(), prophet_config
+    )
 
     y_min, y_max = df["y"].min(), df["y"].max()
     forecast["yhat"] = forecast["yhat"].clip(lower=y_min, upper=y_max)
@@ -132,6 +144,10 @@ def forecast_vnr_for_hotel(hotel_code: str):
         print(f"No VNR data for hotel: {hotel_code}")
         return
 
+    forecast_vnr_series(df, hotel_code)
+
+
+def forecast_vnr_series(df: pd.DataFrame, hotel_code: str):
     model, forecast, train, test, full_df = generate_forecast(df)
     if model is None:
         print(f"Skipping {hotel_code}: Not enough data")
@@ -150,9 +166,30 @@ def forecast_vnr_for_hotel(hotel_code: str):
     plot_forecast(model, forecast, full_df, test, hotel_code, output_dir)
 
 
-def main():
+def forecast_vnr_for_hotels(hotel_codes: List[str], workers: int = FIT_WORKERS):
+    # One series per hotel, so hotels are the unit of parallelism; each worker
+    # fetches, fits and plots its own hotel
+    fit_in_parallel(forecast_vnr_for_hotel, [(code,) for code in hotel_codes], workers)
+
+
+def forecast_all_hotels(workers: int = FIT_WORKERS):
+    # Every active hotel's series from one query instead of one per hotel
+    forecast_partitions(
+        forecast_vnr_series,
+        fetch_all_hotels_series(query, columns, rollup),
+        ["hotel_code"],
+        lambda key, frame: (frame, key[0]),
+        workers,
+    )
+
+
+def main(workers: int = FIT_WORKERS):
+    if ALL_HOTELS:
+        forecast_all_hotels(workers)
+        return
+
     hotel_code = "BOSFRUP"
-    forecast_vnr_for_hotel(hotel_code)
+    forecast_vnr_for_hotels([hotel_code], workers)
 
 
 if __name__ == "__main__":
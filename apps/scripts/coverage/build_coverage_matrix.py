@@ -0,0 +1,43 @@
+import os
+from apps.utils.coverage import CoverageWindow, PAID_MEDIA_DATASETS
+from apps.utils.coverage_matrix import CoverageMatrix, build_coverage_matrix
+from apps.utils.database import QueryTimeoutError
+
+MATRIX_PATH = "csv_exports/coverage/coverage_matrix.bin"
+
+
+def main():
+    window = CoverageWindow.last(6)
+
+    try:
+        matrix = build_coverage_matrix(window)
+    except QueryTimeoutError as error:
+        print(f"[TIMEOUT] {error}")
+        return
+
+    os.makedirs(os.path.dirname(MATRIX_PATH), exist_ok=True)
+    matrix.save(MATRIX_PATH)
+    print(
+        f"[INFO] Saved {len(matrix.hotels)} hotels x {len(matrix.months)} months "
+        f"x {len(matrix.datasets)} datasets to {MATRIX_PATH}"
+    )
+
+    # Later runs (or other scripts) can map the file instead of querying
+    matrix = CoverageMatrix.load(MATRIX_PATH)
+    latest = matrix.months[-1]
+
+    missing_paid = matrix.hotels_where(matrix.missing_any(PAID_MEDIA_DATASETS), latest)
+    print(f"\nHotels missing any paid media in {latest}: {len(missing_paid)}")
+    for hotel_code in missing_paid:
+        print(f"Hotel Code: {hotel_code}")
+
+    vnr_without_trd = matrix.cells_where(
+        matrix.present_all(["VNR"]) & matrix.missing_any(["TRD"])
+    )
+    print(f"\nHotel-months with VNR but no TRD: {len(vnr_without_trd)}")
+    for hotel_code, month in vnr_without_trd:
+        print(f"Hotel Code: {hotel_code}, Month: {month}")
+
+
+if __name__ == "__main__":
+    main()
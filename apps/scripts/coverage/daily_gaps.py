@@ -0,0 +1,40 @@
+import os
+from collections import Counter
+from apps.utils.daily_gaps import find_daily_gaps
+from apps.utils.database import QueryTimeoutError
+from apps.utils.csv_export import export_evaluation_metrics_to_csv
+
+
+def main():
+    # Ignore one-off missing days; outages of a week or more are reported
+    min_gap_days = 7
+
+    try:
+        gaps = find_daily_gaps(min_gap_days=min_gap_days)
+    except QueryTimeoutError as error:
+        print(f"[TIMEOUT] {error}")
+        return
+
+    if not gaps:
+        print(f"No gaps of {min_gap_days}+ days in the last 36 months.")
+        return
+
+    print(f"Gaps of {min_gap_days}+ days (last 36 months):\n")
+    for gap in gaps:
+        print(
+            f"Hotel Code: {gap.hotel_code}, Dataset: {gap.dataset}, "
+            f"Missing: {gap.gap_start} -> {gap.gap_end} ({gap.days} days)"
+        )
+
+    per_dataset = Counter(gap.dataset for gap in gaps)
+    print("\n=== Gaps per dataset ===")
+    for dataset, count in per_dataset.most_common():
+        print(f"{dataset}: {count}")
+
+    filename = "csv_exports/coverage/daily_gaps.csv"
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    export_evaluation_metrics_to_csv([gap._asdict() for gap in gaps], filename)
+
+
+if __name__ == "__main__":
+    main()
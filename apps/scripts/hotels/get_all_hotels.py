@@ -1,5 +1,6 @@
 from sqlmodel import text
 from apps.utils.database import get_session
+from apps.utils.streaming import STREAM_CHUNK_SIZE, stream_rows
 
 # Raw SQL query to get all hotels
 query = text("SELECT * FROM public.hotel ORDER BY id ASC;")
@@ -12,13 +13,21 @@ def get_all_hotels():
         return result
 
 
+# Streaming variant: yields hotels one at a time, fetching chunk_size rows
+# per round trip from a server-side cursor
+def iter_all_hotels(chunk_size: int = STREAM_CHUNK_SIZE):
+    for rows in stream_rows(query, chunk_size=chunk_size):
+        yield from rows
+
+
 # Example usage
-all_hotels = get_all_hotels()
+total_hotels = 0
+for row in iter_all_hotels():
+    print(row)  # Each row is a tuple of hotel columns
+    total_hotels += 1
 
 # Print the results
-if all_hotels:
-    for row in all_hotels:
-        print(row)  # Each row is a tuple of hotel columns
-    print(f"\nTotal hotels: {len(all_hotels)}")
+if total_hotels:
+    print(f"\nTotal hotels: {total_hotels}")
 else:
     print("No hotels found.")
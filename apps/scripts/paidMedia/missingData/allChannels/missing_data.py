@@ -0,0 +1,60 @@
+from collections import defaultdict
+from apps.utils.coverage import (
+    CoverageWindow,
+    find_missing_by_channel,
+    find_missing_by_channel_async,
+)
+from apps.utils.database import QueryTimeoutError
+from apps.utils.csv_export import export_hotel_months_to_csv
+
+
+def get_missing_paid_media_for_all_channels(month_list=None, source_filters=None):
+    # month_list=None checks the last 6 months; source_filters maps a channel
+    # dataset (e.g. "OTA") to its normalized_source list
+    window = CoverageWindow.custom(month_list) if month_list else CoverageWindow.last(6)
+    return find_missing_by_channel(window, sources=source_filters)
+
+
+async def get_missing_paid_media_for_all_channels_async(
+    month_list=None, source_filters=None
+):
+    window = CoverageWindow.custom(month_list) if month_list else CoverageWindow.last(6)
+    return await find_missing_by_channel_async(window, sources=source_filters)
+
+
+def main():
+    custom_months = None  # e.g. ["2023-12", "2025-01", "2025-03"]
+    source_filters = {}  # e.g. {"OTA": ["Expedia TravelAds"]}
+
+    try:
+        missing_by_channel = get_missing_paid_media_for_all_channels(
+            custom_months, source_filters
+        )
+    except QueryTimeoutError as error:
+        print(f"[TIMEOUT] {error}")
+        return
+
+    folder = "customMonths" if custom_months else "lastXmonths"
+    for dataset, missing_rows in missing_by_channel.items():
+        hotel_months = defaultdict(list)
+        for row in missing_rows:
+            hotel_months[row.hotel_code].append(row.month)
+
+        print(f"\n=== {dataset} ===")
+        if source_filters.get(dataset):
+            print(f"Filtered Sources: {source_filters[dataset]}")
+        if hotel_months:
+            for hotel_code, months in hotel_months.items():
+                print(f"Hotel Code: {hotel_code}, Missing Months: {months}")
+        else:
+            print(f"All active hotels have {dataset} data for the selected months.")
+
+        export_hotel_months_to_csv(
+            hotel_months,
+            f"missing_{dataset}_summary.csv",
+            folder=f"csv_exports/paidMedia/missingData/allChannels/{folder}",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from apps.utils.baselines import score_baselines, screen_series
+
+# Offline checks of the baseline screen on synthetic series; no database:
+#
+#   python -m apps.scripts.qa.check_baselines
+
+MONTHS = pd.date_range("2022-01-01", periods=36, freq="MS", tz="UTC")
+
+
+def seasonal_rows(hotel_code, domain, skip=()):
+    return [
+        (hotel_code, domain, month, 100.0 + 10 * month.month)
+        for i, month in enumerate(MONTHS)
+        if i not in skip
+    ]
+
+
+def check_null_keys():
+    # A NULL dimension is its own series instead of aborting the pivot
+    rows = seasonal_rows("A", "google.com") + seasonal_rows("A", None)
+    df = pd.DataFrame(rows, columns=["hotel_code", "domain", "ds", "y"])
+    scores = score_baselines(df, ["hotel_code", "domain"])
+    assert len(scores) == 2, scores
+    assert (scores["points"] == len(MONTHS)).all(), scores
+    kept = screen_series(df, ["hotel_code", "domain"], threshold=-1)
+    assert len(kept) == len(df), kept
+
+
+def check_missing_months():
+    # Seasonal naive lines up calendar months across gaps in the series
+    rows = seasonal_rows("A", "google.com", skip=(5, 6, 7))
+    df = pd.DataFrame(rows, columns=["hotel_code", "domain", "ds", "y"])
+    scores = score_baselines(df, ["hotel_code", "domain"])
+    assert scores.loc[0, "points"] == len(MONTHS) - 3, scores
+    assert np.isclose(scores.loc[0, "seasonal_naive_mape"], 0.0), scores
+
+
+CHECKS = (check_null_keys, check_missing_months)
+
+
+def main():
+    for check in CHECKS:
+        check()
+        print(f"[OK] {check.__name__}")
+
+
+if __name__ == "__main__":
+    main()
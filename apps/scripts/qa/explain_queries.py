@@ -0,0 +1,91 @@
+import argparse
+import os
+from collections import Counter
+
+from apps.utils.csv_export import export_evaluation_metrics_to_csv
+from apps.utils.explain import (
+    EXPLAIN_SNAPSHOT_DIR,
+    diff_snapshots,
+    existing_indexes,
+    explain,
+    find_problems,
+    latest_snapshot,
+    load_snapshot,
+    registered_queries,
+    save_snapshot,
+    suggest_indexes,
+)
+
+# Plans every registered query, saves a snapshot and diffs it against the
+# previous one:
+#
+#   python -m apps.scripts.qa.explain_queries --only paid_media
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE the QA queries")
+    parser.add_argument("--only", help="plan queries whose name contains this")
+    parser.add_argument("--hotel-code", default="BOSFRUP")
+    parser.add_argument("--snapshot-dir", default=EXPLAIN_SNAPSHOT_DIR)
+    parser.add_argument("--against", help="snapshot to diff against")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    queries = [
+        registered
+        for registered in registered_queries(args.hotel_code)
+        if not args.only or args.only in registered.name
+    ]
+
+    plans, findings = {}, []
+    for registered in queries:
+        try:
+            plan = explain(registered.query, registered.params, registered.prepared)
+        except Exception as error:
+            print(f"[WARN] {registered.name}: {error}")
+            continue
+        plans[registered.name] = plan
+        problems = find_problems(registered.name, plan)
+        findings.extend(problems)
+        print(
+            f"[INFO] {registered.name} ({plan['Plan Mode']}): "
+            f"{plan.get('Execution Time', 0):.1f} ms, {len(problems)} findings"
+        )
+
+    print("\n=== Findings ===")
+    for finding in findings:
+        print(f"{finding.query}: {finding.kind} {finding.node} ({finding.detail})")
+    for kind, count in Counter(finding.kind for finding in findings).items():
+        print(f"{kind}: {count}")
+
+    statements = suggest_indexes(findings, existing_indexes())
+    print("\n=== Suggested indexes ===")
+    for statement in statements or ["(none)"]:
+        print(statement)
+
+    previous = args.against or latest_snapshot(args.snapshot_dir)
+    path = save_snapshot(plans, args.snapshot_dir)
+    print(f"\n[INFO] Saved plan snapshot to {path}")
+    if previous:
+        diffs = diff_snapshots(load_snapshot(previous), plans)
+        print(f"\n=== Plan changes since {previous} ===")
+        if not diffs:
+            print("(none)")
+        for name, lines in diffs.items():
+            print(f"\n{name}")
+            print("\n".join(lines))
+
+    filename = "csv_exports/qa/explain_findings.csv"
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    export_evaluation_metrics_to_csv(
+        [finding._asdict() for finding in findings], filename
+    )
+    if statements:
+        with open("csv_exports/qa/suggested_indexes.sql", "w") as f:
+            f.write("\n".join(statements) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import os
+import time
+
+from apps.utils.csv_export import export_evaluation_metrics_to_csv
+from apps.utils.database import print_pool_stats
+from apps.utils.qa_runner import QA_WORKERS, discover_checks, run_checks
+
+# Every last-X check, 8 at a time:
+#
+#   python -m apps.scripts.qa.run_all_checks --workers 8
+#
+# Custom-month checks run only when months are given:
+#
+#   python -m apps.scripts.qa.run_all_checks --months 2023-12 2024-01 2025-03
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run every coverage check")
+    parser.add_argument("--workers", type=int, default=QA_WORKERS)
+    parser.add_argument("--months", nargs="+", metavar="YYYY-MM")
+    parser.add_argument("--only", help="run checks whose name contains this")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    checks = discover_checks(args.only)
+    skipped = [check for check in checks if check.needs_months and not args.months]
+    checks = [check for check in checks if check not in skipped]
+    if skipped:
+        print(f"[INFO] Skipping {len(skipped)} custom-month checks (no --months)")
+
+    print(f"[INFO] Running {len(checks)} checks with {args.workers} workers\n")
+    start = time.perf_counter()
+    results = run_checks(checks, args.workers, args.months)
+    wall_time = time.perf_counter() - start
+
+    total_time = sum(result.seconds for result in results)
+    slowest = max(results, key=lambda result: result.seconds, default=None)
+    print("\n=== QA Report ===")
+    for result in results:
+        detail = f" ({result.error})" if result.error else ""
+        print(
+            f"{result.name}: {result.status}, {result.missing_rows} missing "
+            f"hotel-months across {result.hotels} hotels, "
+            f"{result.seconds:.2f}s{detail}"
+        )
+    print(f"\nWall time: {wall_time:.2f}s (sum of checks: {total_time:.2f}s)")
+    if slowest:
+        print(f"Slowest check: {slowest.name} ({slowest.seconds:.2f}s)")
+    print_pool_stats()
+
+    report = [
+        {
+            "Check": result.name,
+            "Status": result.status,
+            "Missing Hotel-Months": result.missing_rows,
+            "Hotels": result.hotels,
+            "Seconds": round(result.seconds, 3),
+            "Error": result.error,
+        }
+        for result in results
+    ]
+    filename = "csv_exports/qa/qa_report.csv"
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    export_evaluation_metrics_to_csv(report, filename)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import time
+from datetime import date
+
+from apps.utils.coverage import add_months
+from apps.utils.rollups import ROLLUPS, create_rollup_tables, refresh_rollup
+
+# Full rebuild of every rollup (run once, and after backfills):
+#
+#   python -m apps.scripts.rollups.refresh_rollups --full
+#
+# Nightly: re-aggregate the current and previous month only:
+#
+#   python -m apps.scripts.rollups.refresh_rollups --last 2
+#
+# Specific months / tables:
+#
+#   python -m apps.scripts.rollups.refresh_rollups --months 2025-01 2025-03 \
+#       --tables top_ref_domain channel_mix
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Refresh monthly rollup tables")
+    scope = parser.add_mutually_exclusive_group(required=True)
+    scope.add_argument("--full", action="store_true", help="rebuild every month")
+    scope.add_argument("--months", nargs="+", metavar="YYYY-MM")
+    scope.add_argument(
+        "--last",
+        type=int,
+        metavar="N",
+        help="the current month and the N-1 months before it",
+    )
+    parser.add_argument("--tables", nargs="+", choices=sorted(ROLLUPS))
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    tables = args.tables or list(ROLLUPS)
+
+    months = args.months
+    if args.last:
+        # Unlike CoverageWindow.last(), include the current month: it is the
+        # one still receiving rows
+        current = date.today().replace(day=1)
+        months = [add_months(current, -i).strftime("%Y-%m") for i in range(args.last)]
+
+    create_rollup_tables(tables)
+    for table in tables:
+        start = time.perf_counter()
+        rows = refresh_rollup(table, None if args.full else months)
+        elapsed = time.perf_counter() - start
+        scope = "all months" if args.full else ", ".join(months)
+        print(
+            f"[INFO] {ROLLUPS[table].rollup_table}: {rows} rows "
+            f"({scope}) in {elapsed:.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
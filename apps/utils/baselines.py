@@ -0,0 +1,174 @@
+import os
+import warnings
+from typing import Dict, Sequence
+
+import numpy as np
+import pandas as pd
+
+from apps.utils.database import env_bool
+
+# Series whose best baseline MAPE (%) on the test split is at or below this
+# skip Prophet
+BASELINE_MAPE_THRESHOLD = float(os.getenv("BASELINE_MAPE_THRESHOLD", "20"))
+# Fit Prophet on every series regardless of the baselines
+FORCE_PROPHET = env_bool("PROPHET_FORCE", False)
+
+SEASON_LENGTH = 12
+MOVING_AVERAGE_WINDOW = 3
+SES_ALPHA = 0.5
+# generate_forecast skips shorter series; they are left for it to report
+MIN_POINTS = 6
+TRAIN_FRACTION = 0.75
+
+BASELINE_METHODS = ("seasonal_naive", "moving_average", "ses")
+
+
+def series_keys(df: pd.DataFrame, keys: Sequence[str]) -> pd.DataFrame:
+    # NULL dimensions (no domain, a channel type the LEFT JOIN didn't find)
+    # become "" so grouping and pivoting see the same series
+    return df[list(keys)].astype(object).fillna("")
+
+
+def series_matrix(df: pd.DataFrame, keys: Sequence[str]):
+    # One row per series on its own monthly grid from its first to its last
+    # month, NaN where the query returned no row (as generate_forecast
+    # reindexes), NaN-padded to the longest span
+    ds = pd.to_datetime(df["ds"]).dt.tz_localize(None)
+    df = df.assign(
+        **series_keys(df, keys),
+        month=ds.dt.year * 12 + ds.dt.month - 1,
+        y=df["y"].astype("float64"),
+    )
+    groups = df.groupby(list(keys))
+    position = df["month"] - groups["month"].transform("min")
+    wide = df.set_index(list(keys) + [position])["y"].unstack()
+    wide = wide.reindex(columns=range(int(position.max()) + 1))
+    lengths = (position.groupby([df[key] for key in keys]).max() + 1).reindex(
+        wide.index
+    )
+    return wide.index, wide.to_numpy(dtype="float64"), lengths.to_numpy()
+
+
+def baseline_forecasts(values: np.ndarray, split: np.ndarray) -> Dict[str, np.ndarray]:
+    # Forecasts for every cell from the points before grid position `split`
+    # only; callers score the test cells
+    n, length = values.shape
+    rows = np.arange(n)[:, None]
+    t = np.arange(length)[None, :]
+
+    # Moving average and SES run over the observed points only, packed to
+    # the left; the seasonal lag runs on the calendar grid
+    observed = ~np.isnan(values)
+    order = np.argsort(~observed, axis=1, kind="stable")
+    packed = np.take_along_axis(values, order, axis=1)
+    train_points = (observed & (t < split[:, None])).sum(axis=1)
+    last = packed[np.arange(n), train_points - 1][:, None]
+
+    # Seasonal naive: the latest training value for the same month of year,
+    # falling back to the last training value when that month is missing or
+    # the history is too short
+    seasons_back = np.ceil((t - split[:, None] + 1) / SEASON_LENGTH).clip(min=1)
+    source = (t - SEASON_LENGTH * seasons_back).astype(int)
+    lagged = values[rows, source.clip(min=0)]
+    seasonal = np.where(
+        (source >= 0) & ~np.isnan(lagged),
+        lagged,
+        np.broadcast_to(last, source.shape),
+    )
+
+    # Moving average of the last training points, carried flat
+    cumulative = np.concatenate(
+        [np.zeros((n, 1)), np.nancumsum(packed, axis=1)], axis=1
+    )
+    window_start = np.maximum(train_points - MOVING_AVERAGE_WINDOW, 0)
+    moving_average = (
+        cumulative[np.arange(n), train_points] - cumulative[np.arange(n), window_start]
+    ) / (train_points - window_start)
+
+    # Simple exponential smoothing: one pass over time, all series at once
+    level = packed[:, 0].copy()
+    for step in range(1, length):
+        active = step < train_points
+        level = np.where(
+            active, SES_ALPHA * packed[:, step] + (1 - SES_ALPHA) * level, level
+        )
+
+    shape = values.shape
+    return {
+        "seasonal_naive": seasonal,
+        "moving_average": np.broadcast_to(moving_average[:, None], shape),
+        "ses": np.broadcast_to(level[:, None], shape),
+    }
+
+
+def score_baselines(df: pd.DataFrame, keys: Sequence[str]) -> pd.DataFrame:
+    # MAE, RMSE and MAPE of every baseline on the same 75/25 split of the
+    # non-null points as generate_forecast, one row per series. MAPE ignores
+    # zero actuals
+    index, values, lengths = series_matrix(df, keys)
+    observed = ~np.isnan(values)
+    points = observed.sum(axis=1)
+    train_points = np.maximum((points * TRAIN_FRACTION).astype(int), 1)
+    # Grid position of the first test point (the span's end when there is none)
+    rank = np.cumsum(observed, axis=1)
+    after = observed & (rank > train_points[:, None])
+    split = np.where(after.any(axis=1), after.argmax(axis=1), lengths)
+    t = np.arange(values.shape[1])[None, :]
+    test = (t >= split[:, None]) & observed
+    nonzero = test & (values != 0)
+
+    scores = pd.DataFrame(index=index).reset_index()
+    scores["points"] = points
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        # Series without test actuals average an empty slice to NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        for method, forecast in baseline_forecasts(values, split).items():
+            error = np.where(test, forecast - values, np.nan)
+            pct = np.where(nonzero, np.abs(error) / np.abs(values), np.nan)
+            scores[f"{method}_mae"] = np.nanmean(np.abs(error), axis=1)
+            scores[f"{method}_rmse"] = np.sqrt(np.nanmean(error**2, axis=1))
+            scores[f"{method}_mape"] = np.nanmean(pct, axis=1) * 100
+
+    # No usable test actuals (all zero or missing): leave the call to Prophet
+    mape = scores[[f"{method}_mape" for method in BASELINE_METHODS]].fillna(np.inf)
+    scores["best_method"] = [
+        BASELINE_METHODS[i] for i in np.argmin(mape.to_numpy(), axis=1)
+    ]
+    scores["best_mape"] = mape.min(axis=1).to_numpy()
+    return scores
+
+
+def select_for_prophet(
+    scores: pd.DataFrame,
+    threshold: float = BASELINE_MAPE_THRESHOLD,
+    force: bool = FORCE_PROPHET,
+) -> pd.Series:
+    if force:
+        return pd.Series(True, index=scores.index)
+    # Short series still go through generate_forecast, which reports them
+    return (scores["points"] < MIN_POINTS) | (scores["best_mape"] > threshold)
+
+
+def screen_series(
+    df: pd.DataFrame,
+    keys: Sequence[str],
+    threshold: float = BASELINE_MAPE_THRESHOLD,
+    force: bool = FORCE_PROPHET,
+) -> pd.DataFrame:
+    # Rows of the series Prophet should fit; the rest are already forecast
+    # within `threshold` MAPE by a baseline
+    if df.empty:
+        return df
+    scores = score_baselines(df, keys)
+    selected = select_for_prophet(scores, threshold, force)
+    skipped = scores.loc[~selected]
+    print(
+        f"[INFO] Baselines: {len(skipped)} of {len(scores)} series within "
+        f"{threshold:g}% MAPE, Prophet fits {int(selected.sum())}"
+    )
+    for row in skipped.itertuples(index=False):
+        labels = " - ".join(str(getattr(row, key)) for key in keys)
+        print(f"Baseline {row.best_method} for {labels} (MAPE {row.best_mape:.2f}%)")
+
+    keep = pd.MultiIndex.from_frame(scores.loc[selected, list(keys)])
+    return df[pd.MultiIndex.from_frame(series_keys(df, keys)).isin(keep)]
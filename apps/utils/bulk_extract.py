@@ -0,0 +1,114 @@
+import os
+import tempfile
+import time
+from typing import Any, Dict, Optional, Sequence
+
+import pandas as pd
+
+from apps.utils.database import (
+    CHECK_TIMEOUT,
+    QUERY_CANCELED,
+    READONLY_DEFAULT,
+    QueryTimeoutError,
+    fetch_all_async,
+    get_engine,
+    get_session,
+    query_log,
+)
+
+try:
+    import pyarrow  # noqa: F401
+
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# COPY output is spooled in memory up to this size, then to a temp file
+COPY_SPOOL_MAX_BYTES = int(os.getenv("DB_COPY_SPOOL_MAX_BYTES", str(64 * 1024**2)))
+
+
+def render_query(cursor, query, params: Optional[Dict[str, Any]] = None) -> str:
+    # Inline the binds with the driver's own quoting (COPY can't take binds)
+    compiled = query.compile(dialect=get_engine().dialect)
+    bound = compiled.construct_params(params or {})
+    sql = cursor.mogrify(str(compiled), bound).decode()
+    return sql.strip().rstrip(";")
+
+
+def fetch_dataframe(
+    query,
+    params: Optional[Dict[str, Any]] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    # Row tuples through the regular cursor; the baseline for copy_dataframe
+    with get_session() as session:
+        result = session.execute(query, params or {})
+        return pd.DataFrame(result.fetchall(), columns=columns)
+
+
+async def fetch_dataframe_async(
+    query,
+    params: Optional[Dict[str, Any]] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    return pd.DataFrame(await fetch_all_async(query, params), columns=columns)
+
+
+def copy_dataframe(
+    query,
+    params: Optional[Dict[str, Any]] = None,
+    columns: Optional[Sequence[str]] = None,
+    datetime_columns: Sequence[str] = (),
+    dtypes: Optional[Dict[str, str]] = None,
+    use_arrow: bool = False,
+    timeout: Optional[float] = CHECK_TIMEOUT,
+    label: Optional[str] = None,
+    readonly: bool = READONLY_DEFAULT,
+) -> pd.DataFrame:
+    # Same result as fetch_dataframe, through COPY TO STDOUT parsed straight
+    # into typed columns. Runs in a get_session session, so it gets the same
+    # time budget and replica routing
+    read_options: Dict[str, Any] = {
+        "header": None,
+        "names": list(columns) if columns else None,
+        # Datetimes are parsed below; read them as text first
+        "dtype": {**(dtypes or {}), **{c: "string" for c in datetime_columns}},
+    }
+    if use_arrow and HAS_PYARROW:
+        read_options["engine"] = "pyarrow"
+        read_options["dtype_backend"] = "pyarrow"
+
+    start = time.perf_counter()
+    with tempfile.SpooledTemporaryFile(max_size=COPY_SPOOL_MAX_BYTES) as buffer:
+        with get_session(timeout, label, readonly) as session:
+            # The raw cursor shares the session's transaction and settings
+            connection = session.connection().connection.dbapi_connection
+            cursor = connection.cursor()
+            try:
+                sql = render_query(cursor, query, params)
+                copy_sql = f"COPY ({sql}) TO STDOUT WITH (FORMAT csv)"
+                cursor.copy_expert(copy_sql, buffer)
+            except Exception as error:
+                # copy_expert raises the driver's error, not a DBAPIError
+                if timeout and getattr(error, "pgcode", None) == QUERY_CANCELED:
+                    raise QueryTimeoutError(timeout, label) from error
+                raise
+            finally:
+                cursor.close()
+        size = buffer.tell()
+        buffer.seek(0)
+        if size:
+            df = pd.read_csv(buffer, **read_options)
+        else:
+            df = pd.DataFrame(columns=columns)
+
+    for column in datetime_columns:
+        # Keep the session-local wall time (what psycopg2 returns) and drop
+        # the offset, so callers' tz_localize(None) sees the same timestamps
+        wall_time = df[column].astype("string").str.slice(0, 19)
+        df[column] = pd.to_datetime(wall_time).dt.tz_localize("UTC")
+
+    if query_log is not None:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        query_log.record(copy_sql, elapsed_ms, len(df), False)
+    return df
@@ -0,0 +1,67 @@
+import time
+from typing import Any, Callable, Iterator, List, Sequence, Tuple
+
+import pandas as pd
+
+from apps.utils.baselines import screen_series
+from apps.utils.database import env_bool
+from apps.utils.parallel_fit import FIT_WORKERS, fit_in_parallel
+from apps.utils.rollups import fetch_series
+
+# Prophet scripts forecast every active hotel instead of their sample hotel
+ALL_HOTELS = env_bool("PROPHET_ALL_HOTELS", False)
+
+
+def fetch_all_hotels_series(
+    query, columns: Sequence[str], rollup: Tuple[str, str]
+) -> pd.DataFrame:
+    # Every active hotel's series in one statement: the rollup read, or the
+    # per-hotel Prophet query with hotel_code bound to NULL. The monthly
+    # result is small (hotel x dimension x 36 rows), so it is read whole and
+    # the session closed before any fit starts, rather than holding a cursor
+    # open across the fits
+    return fetch_series(query, columns, rollup)
+
+
+def partition_series(
+    df: pd.DataFrame, keys: Sequence[str]
+) -> Iterator[Tuple[Tuple, pd.DataFrame]]:
+    # (key values, frame) per series, in key order. Rows keep their query
+    # order inside each frame, as the per-hotel fetch returned them
+    return iter(df.groupby(list(keys), sort=True))
+
+
+def forecast_partitions(
+    function: Callable,
+    df: pd.DataFrame,
+    keys: Sequence[str],
+    task_args: Callable[[Tuple, pd.DataFrame], Tuple],
+    workers: int = FIT_WORKERS,
+    screen: bool = False,
+) -> List[Any]:
+    # Feeds every (hotel, dimension) series to function(*task_args(key, frame))
+    # through the parallel fitter and reports throughput. With screen, series
+    # a baseline already forecasts well are dropped first
+    if df.empty:
+        print("No data found.")
+        return []
+    if screen:
+        df = screen_series(df, keys)
+
+    seen = []
+
+    def tasks():
+        for key, frame in partition_series(df, keys):
+            seen.append(key)
+            yield task_args(key, frame)
+
+    start = time.perf_counter()
+    results = fit_in_parallel(function, tasks(), workers)
+    elapsed = time.perf_counter() - start
+    rate = len(seen) / elapsed if elapsed else 0.0
+    print(
+        f"\n[INFO] Forecast {len(seen)} series across "
+        f"{df['hotel_code'].nunique()} hotels in {elapsed:.1f}s "
+        f"({rate:.2f} series/s, {max(1, workers)} workers)"
+    )
+    return results
@@ -0,0 +1,447 @@
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlmodel import text
+
+from apps.utils.database import get_async_session
+from apps.utils.prepared import execute_prepared
+from apps.utils.query_cache import cached_fetchall
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    name: str
+    table: str
+    # A hotel-month whose metrics all sum to zero counts as missing; with no
+    # metrics only the absence of rows does
+    metrics: Tuple[str, ...] = ()
+    # paid_media rows are split by media_channel.name and can be narrowed to
+    # a list of paid_media_source.normalized_source values
+    media_channel: Optional[str] = None
+
+
+DATASETS: Dict[str, DatasetSpec] = {
+    spec.name: spec
+    for spec in (
+        DatasetSpec(
+            "TRD", "top_ref_domain", ("visits", "booking", "room_nights", "revenue")
+        ),
+        DatasetSpec("VNR", "visit_revenue", ("traffic", "revenue")),
+        DatasetSpec("sourceTraffic", "source_traffic", ("visits", "revenue")),
+        DatasetSpec("channelMix", "channel_mix"),
+        DatasetSpec("OTA", "paid_media", media_channel="OTA"),
+        DatasetSpec("displayAds", "paid_media", media_channel="DISPLAY ADS"),
+        DatasetSpec("metaSearch", "paid_media", media_channel="METASEARCH"),
+        DatasetSpec("paidSearch", "paid_media", media_channel="PAID SEARCH"),
+        DatasetSpec("paidSocial", "paid_media", media_channel="PAID SOCIAL"),
+        DatasetSpec(
+            "sponsoredListing", "paid_media", media_channel="SPONSORED LISTING"
+        ),
+    )
+}
+
+
+def add_months(month_start: date, months: int) -> date:
+    index = month_start.year * 12 + month_start.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+@dataclass(frozen=True)
+class CoverageWindow:
+    # Months as "YYYY-MM", sorted and de-duplicated
+    months: Tuple[str, ...]
+
+    @classmethod
+    def last(cls, count: int, today: Optional[date] = None) -> "CoverageWindow":
+        # The `count` complete months before the current one, matching the old
+        # generate_series(1, count) CTE but resolved client-side so last-N and
+        # custom windows share one statement
+        current = (today or date.today()).replace(day=1)
+        return cls.custom(
+            add_months(current, -i).strftime("%Y-%m") for i in range(1, count + 1)
+        )
+
+    @classmethod
+    def custom(cls, months) -> "CoverageWindow":
+        months = tuple(sorted(set(months)))
+        if not months:
+            raise ValueError("A coverage window needs at least one month")
+        return cls(months)
+
+    def month_starts(self) -> List[date]:
+        return [date.fromisoformat(f"{month}-01") for month in self.months]
+
+    def ranges(self) -> List[Tuple[date, date]]:
+        # Half-open [start, end) date ranges with contiguous months merged
+        ranges: List[Tuple[date, date]] = []
+        for start in self.month_starts():
+            end = add_months(start, 1)
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], end)
+            else:
+                ranges.append((start, end))
+        return ranges
+
+    def params(self) -> Dict[str, Any]:
+        ranges = self.ranges()
+        return {
+            "month_list": [start.isoformat() for start in self.month_starts()],
+            "range_starts": [start.isoformat() for start, _ in ranges],
+            "range_ends": [end.isoformat() for _, end in ranges],
+            "window_start": ranges[0][0],
+            "window_end": ranges[-1][1],
+        }
+
+
+# The fact tables are read through `ranges`: a join on plain comparisons of
+# `date` gets an index (or partition) range scan per coalesced range, and the
+# outer window bounds let the planner prune before it sees the ranges
+WINDOW_CTES = """
+        WITH months AS (
+            SELECT CAST(m AS DATE) AS month_start
+            FROM UNNEST(CAST(:month_list AS TEXT[])) AS m
+        ),
+        ranges AS (
+            SELECT
+                CAST(r.range_start AS DATE) AS range_start,
+                CAST(r.range_end AS DATE) AS range_end
+            FROM UNNEST(
+                CAST(:range_starts AS TEXT[]), CAST(:range_ends AS TEXT[])
+            ) AS r(range_start, range_end)
+        ),
+        active_hotels AS (
+            SELECT id AS hotel_id, code AS hotel_code
+            FROM public.hotel
+            WHERE is_active = true
+        ),"""
+
+
+def range_scan(table: str, alias: str) -> str:
+    return (
+        f"ranges r\n            JOIN public.{table} {alias}\n"
+        f"              ON {alias}.date >= r.range_start AND {alias}.date < r.range_end"
+    )
+
+
+def fact_scan(spec: DatasetSpec, filtered: bool = False) -> Tuple[str, str]:
+    # FROM and WHERE bodies selecting the spec's rows (alias `t`) inside the
+    # window's ranges, with the channel and source filters applied
+    joins = []
+    conditions = [
+        "t.date >= CAST(:window_start AS DATE)",
+        "t.date < CAST(:window_end AS DATE)",
+    ]
+    if spec.media_channel:
+        joins.append("JOIN public.media_channel mc ON t.media_id = mc.id")
+        conditions.append("mc.name = :media_channel")
+        if filtered:
+            joins.append(
+                "JOIN public.paid_media_source pms ON t.paid_media_source_id = pms.id"
+            )
+            conditions.append("pms.normalized_source = ANY(CAST(:sources AS TEXT[]))")
+    join_sql = "".join(f"\n            {join}" for join in joins)
+    where_sql = "\n              AND ".join(conditions)
+    return f"{range_scan(spec.table, 't')}{join_sql}", where_sql
+
+
+@lru_cache(maxsize=None)
+def build_query(spec: DatasetSpec, filtered: bool = False):
+    # One statement per (spec, filtered): months, channel and sources are all
+    # binds, so every window reuses the same text, cache key shape and plan
+    from_sql, where_sql = fact_scan(spec, filtered)
+    totals = "".join(
+        f",\n                COALESCE(SUM(t.{metric}), 0) AS total_{metric}"
+        for metric in spec.metrics
+    )
+    missing = "a.hotel_id IS NULL"
+    if spec.metrics:
+        all_zero = " AND ".join(f"a.total_{metric} = 0" for metric in spec.metrics)
+        missing += f" OR ({all_zero})"
+
+    return text(
+        f"""{WINDOW_CTES}
+        aggregated AS (
+            SELECT
+                t.hotel_id,
+                CAST(DATE_TRUNC('month', t.date) AS DATE) AS month_start,
+                COUNT(*) AS row_count{totals}
+            FROM {from_sql}
+            WHERE {where_sql}
+            GROUP BY t.hotel_id, CAST(DATE_TRUNC('month', t.date) AS DATE)
+        )
+        SELECT h.hotel_code, TO_CHAR(m.month_start, 'YYYY-MM') AS month
+        FROM active_hotels h
+        CROSS JOIN months m
+        LEFT JOIN aggregated a
+          ON a.hotel_id = h.hotel_id AND a.month_start = m.month_start
+        WHERE {missing}
+        ORDER BY h.hotel_code, month;
+        """
+    )
+
+
+def get_spec(dataset) -> DatasetSpec:
+    return dataset if isinstance(dataset, DatasetSpec) else DATASETS[dataset]
+
+
+def coverage_query(
+    dataset, window: CoverageWindow, sources: Optional[Sequence[str]] = None
+):
+    spec = get_spec(dataset)
+    if sources and not spec.media_channel:
+        raise ValueError(f"{spec.name} does not support a source filter")
+    params = window.params()
+    if spec.media_channel:
+        params["media_channel"] = spec.media_channel
+    if sources:
+        params["sources"] = list(sources)
+    return build_query(spec, bool(sources)), params
+
+
+def find_missing(
+    dataset, window: CoverageWindow, sources: Optional[Sequence[str]] = None
+) -> List:
+    # Rows of (hotel_code, month) for active hotels missing the dataset
+    query, params = coverage_query(dataset, window, sources)
+    return cached_fetchall(query, params, execute=execute_prepared)
+
+
+async def find_missing_async(
+    dataset, window: CoverageWindow, sources: Optional[Sequence[str]] = None
+) -> List:
+    query, params = coverage_query(dataset, window, sources)
+    async with get_async_session() as session:
+        result = await session.execute(query, params)
+        return result.fetchall()
+
+
+PAID_MEDIA_DATASETS = tuple(
+    name for name, spec in DATASETS.items() if spec.table == "paid_media"
+)
+
+
+@lru_cache(maxsize=None)
+def build_channel_query(filtered: bool = False):
+    # One scan of paid_media for every channel at once, grouped by media_id;
+    # per-channel source filters arrive as parallel (channel, source) arrays
+    source_join = ""
+    source_condition = ""
+    source_filters = ""
+    channel_sources = "CAST(NULL AS TEXT[]) AS sources"
+    channel_join = ""
+    if filtered:
+        source_filters = """
+        source_filters AS (
+            SELECT f.channel, ARRAY_AGG(f.source) AS sources
+            FROM UNNEST(
+                CAST(:filter_channels AS TEXT[]), CAST(:filter_sources AS TEXT[])
+            ) AS f(channel, source)
+            GROUP BY f.channel
+        ),"""
+        channel_sources = "sf.sources"
+        channel_join = (
+            "\n            LEFT JOIN source_filters sf ON sf.channel = mc.name"
+        )
+        source_join = """
+            LEFT JOIN public.paid_media_source pms
+              ON pm.paid_media_source_id = pms.id"""
+        source_condition = """
+              AND (cm.sources IS NULL OR pms.normalized_source = ANY(cm.sources))"""
+
+    return text(
+        f"""{WINDOW_CTES}{source_filters}
+        channel_media AS (
+            SELECT mc.id AS media_id, mc.name AS channel, {channel_sources}
+            FROM public.media_channel mc{channel_join}
+            WHERE mc.name = ANY(CAST(:channels AS TEXT[]))
+        ),
+        aggregated AS (
+            SELECT
+                pm.hotel_id,
+                pm.media_id,
+                CAST(DATE_TRUNC('month', pm.date) AS DATE) AS month_start,
+                COUNT(*) AS row_count
+            FROM {range_scan("paid_media", "pm")}
+            JOIN channel_media cm ON cm.media_id = pm.media_id{source_join}
+            WHERE pm.date >= CAST(:window_start AS DATE)
+              AND pm.date < CAST(:window_end AS DATE){source_condition}
+            GROUP BY
+                pm.hotel_id, pm.media_id, CAST(DATE_TRUNC('month', pm.date) AS DATE)
+        ),
+        present AS (
+            SELECT DISTINCT a.hotel_id, cm.channel, a.month_start
+            FROM aggregated a
+            JOIN channel_media cm ON cm.media_id = a.media_id
+        )
+        SELECT c.channel, h.hotel_code, TO_CHAR(m.month_start, 'YYYY-MM') AS month
+        FROM active_hotels h
+        CROSS JOIN months m
+        CROSS JOIN UNNEST(CAST(:channels AS TEXT[])) AS c(channel)
+        LEFT JOIN present p
+          ON p.hotel_id = h.hotel_id
+         AND p.channel = c.channel
+         AND p.month_start = m.month_start
+        WHERE p.hotel_id IS NULL
+        ORDER BY c.channel, h.hotel_code, month;
+        """
+    )
+
+
+def channel_coverage_query(
+    window: CoverageWindow,
+    datasets: Sequence[str] = PAID_MEDIA_DATASETS,
+    sources: Optional[Dict[str, Sequence[str]]] = None,
+):
+    specs = [get_spec(dataset) for dataset in datasets]
+    for spec in specs:
+        if spec.table != "paid_media":
+            raise ValueError(f"{spec.name} is not a paid media dataset")
+    params = window.params()
+    params["channels"] = [spec.media_channel for spec in specs]
+
+    filter_channels, filter_sources = [], []
+    for dataset, dataset_sources in (sources or {}).items():
+        for source in dataset_sources or ():
+            filter_channels.append(get_spec(dataset).media_channel)
+            filter_sources.append(source)
+    if filter_channels:
+        params["filter_channels"] = filter_channels
+        params["filter_sources"] = filter_sources
+    return build_channel_query(bool(filter_channels)), params, specs
+
+
+def group_by_dataset(rows, specs: Sequence[DatasetSpec]) -> Dict[str, List]:
+    names = {spec.media_channel: spec.name for spec in specs}
+    missing: Dict[str, List] = {spec.name: [] for spec in specs}
+    for row in rows:
+        missing[names[row.channel]].append(row)
+    return missing
+
+
+def find_missing_by_channel(
+    window: CoverageWindow,
+    datasets: Sequence[str] = PAID_MEDIA_DATASETS,
+    sources: Optional[Dict[str, Sequence[str]]] = None,
+) -> Dict[str, List]:
+    # Same rows as find_missing for each paid media dataset, keyed by dataset
+    # name, from a single pass over paid_media
+    query, params, specs = channel_coverage_query(window, datasets, sources)
+    rows = cached_fetchall(query, params, execute=execute_prepared)
+    return group_by_dataset(rows, specs)
+
+
+async def find_missing_by_channel_async(
+    window: CoverageWindow,
+    datasets: Sequence[str] = PAID_MEDIA_DATASETS,
+    sources: Optional[Dict[str, Sequence[str]]] = None,
+) -> Dict[str, List]:
+    query, params, specs = channel_coverage_query(window, datasets, sources)
+    async with get_async_session() as session:
+        result = await session.execute(query, params)
+        return group_by_dataset(result.fetchall(), specs)
+
+
+BRAND_DATASETS = ("TRD", "VNR", "sourceTraffic", "channelMix")
+
+PRESENT = "present"
+ZERO = "zero"
+MISSING = "missing"
+
+
+@lru_cache(maxsize=None)
+def build_brand_query(specs: Tuple[DatasetSpec, ...], incomplete_only: bool = True):
+    # Each dataset gets its own monthly aggregate over the shared window; all
+    # of them are joined to one hotel-month grid, one status column per table
+    aggregates = []
+    joins = []
+    statuses = []
+    for spec in specs:
+        alias = f"{spec.table}_monthly"
+        totals = "".join(
+            f",\n                COALESCE(SUM(t.{metric}), 0) AS total_{metric}"
+            for metric in spec.metrics
+        )
+        aggregates.append(
+            f"""
+        {alias} AS (
+            SELECT
+                t.hotel_id,
+                CAST(DATE_TRUNC('month', t.date) AS DATE) AS month_start{totals}
+            FROM {range_scan(spec.table, "t")}
+            WHERE t.date >= CAST(:window_start AS DATE)
+              AND t.date < CAST(:window_end AS DATE)
+            GROUP BY t.hotel_id, CAST(DATE_TRUNC('month', t.date) AS DATE)
+        ),"""
+        )
+        joins.append(
+            f"""
+            LEFT JOIN {alias}
+              ON {alias}.hotel_id = h.hotel_id AND {alias}.month_start = m.month_start"""
+        )
+        zero = ""
+        if spec.metrics:
+            all_zero = " AND ".join(f"{alias}.total_{m} = 0" for m in spec.metrics)
+            zero = f" WHEN {all_zero} THEN '{ZERO}'"
+        statuses.append(
+            f"CASE WHEN {alias}.hotel_id IS NULL THEN '{MISSING}'{zero} "
+            f"ELSE '{PRESENT}' END AS {spec.table}"
+        )
+
+    status_sql = ",\n                ".join(statuses)
+    where_sql = ""
+    if incomplete_only:
+        where_sql = "\n        WHERE " + " OR ".join(
+            f"s.{spec.table} <> '{PRESENT}'" for spec in specs
+        )
+
+    return text(
+        f"""{WINDOW_CTES}{"".join(aggregates)}
+        statuses AS (
+            SELECT
+                h.hotel_code,
+                TO_CHAR(m.month_start, 'YYYY-MM') AS month,
+                {status_sql}
+            FROM active_hotels h
+            CROSS JOIN months m{"".join(joins)}
+        )
+        SELECT s.*
+        FROM statuses s{where_sql}
+        ORDER BY s.hotel_code, s.month;
+        """
+    )
+
+
+def brand_coverage_query(
+    window: CoverageWindow,
+    datasets: Sequence[str] = BRAND_DATASETS,
+    incomplete_only: bool = True,
+):
+    specs = tuple(get_spec(dataset) for dataset in datasets)
+    for spec in specs:
+        if spec.media_channel:
+            raise ValueError(f"{spec.name} is not a brand.com dataset")
+    return build_brand_query(specs, incomplete_only), window.params(), specs
+
+
+def find_brand_coverage(
+    window: CoverageWindow,
+    datasets: Sequence[str] = BRAND_DATASETS,
+    incomplete_only: bool = True,
+) -> List:
+    # Rows of (hotel_code, month, <table>...) where each table column is
+    # present, zero or missing; by default only hotel-months with a gap
+    query, params, _ = brand_coverage_query(window, datasets, incomplete_only)
+    return cached_fetchall(query, params, execute=execute_prepared)
+
+
+async def find_brand_coverage_async(
+    window: CoverageWindow,
+    datasets: Sequence[str] = BRAND_DATASETS,
+    incomplete_only: bool = True,
+) -> List:
+    query, params, _ = brand_coverage_query(window, datasets, incomplete_only)
+    async with get_async_session() as session:
+        result = await session.execute(query, params)
+        return result.fetchall()
@@ -0,0 +1,166 @@
+import json
+import struct
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlmodel import text
+
+from apps.utils.coverage import (
+    BRAND_DATASETS,
+    DATASETS,
+    PAID_MEDIA_DATASETS,
+    PRESENT,
+    CoverageWindow,
+    find_brand_coverage,
+    find_missing_by_channel,
+)
+from apps.utils.database import get_session
+
+MAGIC = b"QACOVMX1"
+# The bit array starts on a 64-byte boundary so it can be memory-mapped
+ALIGNMENT = 64
+
+active_hotel_codes_query = text(
+    "SELECT code FROM public.hotel WHERE is_active = true ORDER BY code"
+)
+
+
+class CoverageMatrix:
+    # bits[hotel, month, byte] holds one bit per dataset (little bit order):
+    # set = present, clear = missing or all-zero. Dataset groups become byte
+    # masks, so "any/all of these datasets" is one vectorized AND per byte
+    def __init__(
+        self,
+        hotels: Sequence[str],
+        months: Sequence[str],
+        datasets: Sequence[str],
+        bits: Optional[np.ndarray] = None,
+    ):
+        self.hotels = list(hotels)
+        self.months = list(months)
+        self.datasets = list(datasets)
+        self.hotel_index = {code: i for i, code in enumerate(self.hotels)}
+        self.month_index = {month: i for i, month in enumerate(self.months)}
+        self.dataset_index = {name: i for i, name in enumerate(self.datasets)}
+        shape = (len(self.hotels), len(self.months), (len(self.datasets) + 7) // 8)
+        self.bits = np.zeros(shape, dtype=np.uint8) if bits is None else bits
+
+    @classmethod
+    def all_present(
+        cls, hotels: Sequence[str], months: Sequence[str], datasets: Sequence[str]
+    ) -> "CoverageMatrix":
+        matrix = cls(hotels, months, datasets)
+        matrix.bits[:] = matrix.mask(datasets)
+        return matrix
+
+    def mask(self, datasets: Iterable[str]) -> np.ndarray:
+        flags = np.zeros(self.bits.shape[-1] * 8, dtype=bool)
+        for name in datasets:
+            flags[self.dataset_index[name]] = True
+        return np.packbits(flags, bitorder="little")
+
+    def set(self, hotel_code: str, month: str, dataset: str, present: bool) -> None:
+        byte, bit = divmod(self.dataset_index[dataset], 8)
+        cell = self.bits[self.hotel_index[hotel_code], self.month_index[month]]
+        if present:
+            cell[byte] |= np.uint8(1 << bit)
+        else:
+            cell[byte] &= np.uint8(~(1 << bit) & 0xFF)
+
+    def present_all(self, datasets: Iterable[str]) -> np.ndarray:
+        # (hotel, month) booleans: every listed dataset present
+        mask = self.mask(datasets)
+        return ((self.bits & mask) == mask).all(axis=-1)
+
+    def present_any(self, datasets: Iterable[str]) -> np.ndarray:
+        mask = self.mask(datasets)
+        return ((self.bits & mask) != 0).any(axis=-1)
+
+    def missing_any(self, datasets: Iterable[str]) -> np.ndarray:
+        return ~self.present_all(datasets)
+
+    def missing_all(self, datasets: Iterable[str]) -> np.ndarray:
+        return ~self.present_any(datasets)
+
+    def hotels_where(self, condition: np.ndarray, month: str) -> List[str]:
+        # e.g. hotels_where(m.missing_any(PAID_MEDIA_DATASETS), "2025-03")
+        rows = np.flatnonzero(condition[:, self.month_index[month]])
+        return [self.hotels[i] for i in rows]
+
+    def months_where(self, condition: np.ndarray, hotel_code: str) -> List[str]:
+        columns = np.flatnonzero(condition[self.hotel_index[hotel_code]])
+        return [self.months[i] for i in columns]
+
+    def cells_where(self, condition: np.ndarray) -> List[Tuple[str, str]]:
+        # e.g. cells_where(m.present_all(["VNR"]) & m.missing_any(["TRD"]))
+        return [(self.hotels[h], self.months[m]) for h, m in np.argwhere(condition)]
+
+    def to_hotel_months(self, dataset: str) -> Dict[str, List[str]]:
+        # The {hotel_code: [missing months]} shape the scripts export
+        missing = self.missing_any([dataset])
+        return {
+            self.hotels[h]: [self.months[m] for m in np.flatnonzero(row)]
+            for h, row in enumerate(missing)
+            if row.any()
+        }
+
+    def save(self, path: str) -> None:
+        header = json.dumps(
+            {
+                "hotels": self.hotels,
+                "months": self.months,
+                "datasets": self.datasets,
+                "shape": list(self.bits.shape),
+            }
+        ).encode("utf-8")
+        prefix = len(MAGIC) + 8 + len(header)
+        padding = -prefix % ALIGNMENT
+        with open(path, "wb") as file:
+            file.write(MAGIC)
+            file.write(struct.pack("<Q", len(header) + padding))
+            file.write(header + b" " * padding)
+            file.write(np.ascontiguousarray(self.bits).tobytes())
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "CoverageMatrix":
+        with open(path, "rb") as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a coverage matrix file")
+            (header_size,) = struct.unpack("<Q", file.read(8))
+            header = json.loads(file.read(header_size))
+            offset = file.tell()
+            shape = tuple(header["shape"])
+            if mmap:
+                bits = np.memmap(path, np.uint8, "r", offset=offset, shape=shape)
+            else:
+                bits = np.fromfile(file, np.uint8).reshape(shape)
+        return cls(header["hotels"], header["months"], header["datasets"], bits)
+
+
+def build_coverage_matrix(
+    window: CoverageWindow,
+    datasets: Sequence[str] = tuple(DATASETS),
+) -> CoverageMatrix:
+    # Two statements whatever the dataset count: the combined brand.com check
+    # and the single-pass paid media check
+    with get_session() as session:
+        hotels = [row.code for row in session.execute(active_hotel_codes_query)]
+    matrix = CoverageMatrix.all_present(hotels, window.months, datasets)
+
+    brand = [name for name in datasets if name in BRAND_DATASETS]
+    if brand:
+        columns = {name: DATASETS[name].table for name in brand}
+        for row in find_brand_coverage(window, brand):
+            if row.hotel_code not in matrix.hotel_index:
+                continue
+            for name, column in columns.items():
+                if getattr(row, column) != PRESENT:
+                    matrix.set(row.hotel_code, row.month, name, False)
+
+    paid = [name for name in datasets if name in PAID_MEDIA_DATASETS]
+    if paid:
+        for name, rows in find_missing_by_channel(window, paid).items():
+            for row in rows:
+                if row.hotel_code in matrix.hotel_index:
+                    matrix.set(row.hotel_code, row.month, name, False)
+    return matrix
@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from sqlmodel import text
+
+from apps.utils.coverage import (
+    PRESENT,
+    WINDOW_CTES,
+    ZERO,
+    CoverageWindow,
+    DatasetSpec,
+    coverage_query,
+    fact_scan,
+    get_spec,
+)
+from apps.utils.prepared import execute_prepared
+from apps.utils.query_cache import CACHE_DIR, cached_fetchall
+
+COVERAGE_STATE_DIR = os.getenv(
+    "QA_COVERAGE_STATE_DIR", os.path.join(CACHE_DIR, "coverage")
+)
+# The checksum doesn't read metric values, so an in-place update that keeps
+# the row count and dates is only picked up once the stored status is older
+# than this
+COVERAGE_RECHECK_SECONDS = float(
+    os.getenv("QA_COVERAGE_RECHECK_SECONDS", str(7 * 24 * 3600))
+)
+
+
+class MissingHotelMonth(NamedTuple):
+    hotel_code: str
+    month: str
+
+
+@lru_cache(maxsize=None)
+def build_checksum_query(spec: DatasetSpec, filtered: bool = False):
+    # Row count, distinct days and max(date) per hotel-month, for every active
+    # hotel-month of the window (NULLs where there are no rows). Only hotel_id
+    # and date are read from the fact table, so a (date, hotel_id) or
+    # (hotel_id, date) index serves it without touching the metric columns
+    from_sql, where_sql = fact_scan(spec, filtered)
+    return text(
+        f"""{WINDOW_CTES}
+        checksums AS (
+            SELECT
+                t.hotel_id,
+                CAST(DATE_TRUNC('month', t.date) AS DATE) AS month_start,
+                COUNT(*) AS row_count,
+                COUNT(DISTINCT t.date) AS day_count,
+                MAX(t.date) AS max_date
+            FROM {from_sql}
+            WHERE {where_sql}
+            GROUP BY t.hotel_id, CAST(DATE_TRUNC('month', t.date) AS DATE)
+        )
+        SELECT
+            h.hotel_id,
+            h.hotel_code,
+            TO_CHAR(m.month_start, 'YYYY-MM') AS month,
+            c.row_count,
+            c.day_count,
+            c.max_date
+        FROM active_hotels h
+        CROSS JOIN months m
+        LEFT JOIN checksums c
+          ON c.hotel_id = h.hotel_id AND c.month_start = m.month_start
+        ORDER BY h.hotel_code, month;
+        """
+    )
+
+
+@lru_cache(maxsize=None)
+def build_status_query(spec: DatasetSpec, filtered: bool = False):
+    # The all-zero rule, only for the hotels and months whose checksum moved
+    from_sql, where_sql = fact_scan(spec, filtered)
+    all_zero = " AND ".join(
+        f"COALESCE(SUM(t.{metric}), 0) = 0" for metric in spec.metrics
+    )
+    return text(
+        f"""{WINDOW_CTES.rstrip(",")}
+        SELECT
+            t.hotel_id,
+            TO_CHAR(t.date, 'YYYY-MM') AS month,
+            {all_zero} AS all_zero
+        FROM {from_sql}
+        WHERE {where_sql}
+          AND t.hotel_id = ANY(CAST(:hotel_ids AS BIGINT[]))
+        GROUP BY t.hotel_id, TO_CHAR(t.date, 'YYYY-MM')
+        """
+    )
+
+
+def state_path(
+    spec: DatasetSpec, sources: Optional[Sequence[str]], directory: str
+) -> str:
+    name = spec.name
+    if sources:
+        digest = hashlib.sha1(json.dumps(sorted(sources)).encode("utf-8"))
+        name += f"-{digest.hexdigest()[:12]}"
+    return os.path.join(directory, f"{name}.json")
+
+
+def load_state(path: str) -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(path) as file:
+            return json.load(file)["entries"]
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def save_state(path: str, entries: Dict[str, Dict[str, Any]]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump({"entries": entries}, file)
+    os.replace(tmp_path, path)
+
+
+def recompute_statuses(
+    spec: DatasetSpec, filtered: bool, params: Dict[str, Any], keys
+) -> Dict[str, str]:
+    # Status of each "hotel_id|month" key that has rows; a key whose rows were
+    # deleted after the checksum pass is simply absent
+    if not keys:
+        return {}
+    if not spec.metrics:
+        return {key: PRESENT for key in keys}
+
+    status_params = {
+        **params,
+        **CoverageWindow.custom({key.split("|")[1] for key in keys}).params(),
+        "hotel_ids": sorted({int(key.split("|")[0]) for key in keys}),
+    }
+    rows = cached_fetchall(
+        build_status_query(spec, filtered), status_params, execute=execute_prepared
+    )
+    wanted = set(keys)
+    statuses = {}
+    for row in rows:
+        key = f"{row.hotel_id}|{row.month}"
+        if key in wanted:
+            statuses[key] = ZERO if row.all_zero else PRESENT
+    return statuses
+
+
+def find_missing_incremental(
+    dataset,
+    window: CoverageWindow,
+    sources: Optional[Sequence[str]] = None,
+    state_dir: str = COVERAGE_STATE_DIR,
+) -> List[MissingHotelMonth]:
+    # Same hotel-months as coverage.find_missing. A cheap checksum pass
+    # (row count, distinct days, max(date)) runs over the window; only
+    # hotel-months whose checksum moved since the stored one, or whose stored
+    # status is older than COVERAGE_RECHECK_SECONDS, get the metric
+    # aggregation. The rest keep their stored status
+    spec = get_spec(dataset)
+    _, params = coverage_query(spec, window, sources)
+    filtered = bool(sources)
+    path = state_path(spec, sources, state_dir)
+    entries = load_state(path)
+    now = time.time()
+
+    rows = cached_fetchall(
+        build_checksum_query(spec, filtered), params, execute=execute_prepared
+    )
+    checksums = {}
+    for row in rows:
+        if row.row_count is not None:
+            key = f"{row.hotel_id}|{row.month}"
+            checksums[key] = [row.row_count, row.day_count, str(row.max_date)]
+    changed = [
+        key
+        for key, checksum in checksums.items()
+        if entries.get(key, {}).get("checksum") != checksum
+        or now - entries[key].get("checked", 0) > COVERAGE_RECHECK_SECONDS
+    ]
+    statuses = recompute_statuses(spec, filtered, params, changed)
+
+    # Entries outside this window are kept for other windows; inside it, the
+    # checksum pass is authoritative, so hotel-months without rows are dropped
+    window_months = set(window.months)
+    merged = {
+        key: entry
+        for key, entry in entries.items()
+        if key.split("|")[1] not in window_months
+    }
+    recomputed = set(changed)
+    for key, checksum in checksums.items():
+        if key in recomputed:
+            if key in statuses:
+                merged[key] = {
+                    "checksum": checksum,
+                    "status": statuses[key],
+                    "checked": now,
+                }
+        else:
+            merged[key] = entries[key]
+    save_state(path, merged)
+    print(
+        f"[INFO] {spec.name}: {len(checksums)} hotel-months with data, "
+        f"{len(changed)} recomputed"
+    )
+
+    missing = [
+        MissingHotelMonth(row.hotel_code, row.month)
+        for row in rows
+        if merged.get(f"{row.hotel_id}|{row.month}", {}).get("status") != PRESENT
+    ]
+    return sorted(missing)
@@ -0,0 +1,138 @@
+from datetime import date
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from sqlmodel import text
+
+from apps.utils.coverage import DATASETS, CoverageWindow, get_spec
+from apps.utils.prepared import execute_prepared
+from apps.utils.query_cache import cached_fetchall
+
+
+class Gap(NamedTuple):
+    hotel_code: str
+    dataset: str
+    gap_start: date
+    gap_end: date  # inclusive
+    days: int
+
+
+@lru_cache(maxsize=None)
+def build_gap_query(table: str, by_channel: bool = False):
+    # Gaps-and-islands over distinct (hotel, dataset, date) days: LEAD finds
+    # the next day with data, and any step wider than one day is a gap. Two
+    # sentinel days per hotel (the day before the window and the window end)
+    # turn leading/trailing outages and hotels with no rows at all into
+    # ordinary steps, so every gap comes out of one scan of the table
+    if by_channel:
+        dataset = "mc.name"
+        channel_join = (
+            "\n            JOIN public.media_channel mc ON t.media_id = mc.id"
+        )
+        channel_condition = (
+            "\n              AND mc.name = ANY(CAST(:datasets AS TEXT[]))"
+        )
+    else:
+        dataset = "CAST(:dataset AS TEXT)"
+        channel_join = ""
+        channel_condition = ""
+
+    return text(
+        f"""
+        WITH active_hotels AS (
+            SELECT id AS hotel_id, code AS hotel_code
+            FROM public.hotel
+            WHERE is_active = true
+        ),
+        datasets AS (
+            SELECT d AS dataset FROM UNNEST(CAST(:datasets AS TEXT[])) AS d
+        ),
+        days AS (
+            SELECT DISTINCT t.hotel_id, {dataset} AS dataset, t.date
+            FROM public.{table} t{channel_join}
+            WHERE t.date >= CAST(:window_start AS DATE)
+              AND t.date < CAST(:window_end AS DATE){channel_condition}
+        ),
+        bounded AS (
+            SELECT hotel_id, dataset, date FROM days
+            UNION ALL
+            SELECT h.hotel_id, d.dataset, CAST(:window_start AS DATE) - 1
+            FROM active_hotels h CROSS JOIN datasets d
+            UNION ALL
+            SELECT h.hotel_id, d.dataset, CAST(:window_end AS DATE)
+            FROM active_hotels h CROSS JOIN datasets d
+        ),
+        steps AS (
+            SELECT
+                hotel_id,
+                dataset,
+                date,
+                LEAD(date) OVER (
+                    PARTITION BY hotel_id, dataset ORDER BY date
+                ) AS next_date
+            FROM bounded
+        )
+        SELECT
+            h.hotel_code,
+            s.dataset,
+            s.date + 1 AS gap_start,
+            s.next_date - 1 AS gap_end,
+            s.next_date - s.date - 1 AS days
+        FROM steps s
+        JOIN active_hotels h ON h.hotel_id = s.hotel_id
+        WHERE s.next_date - s.date - 1 >= :min_gap_days
+        ORDER BY h.hotel_code, s.dataset, gap_start;
+        """
+    )
+
+
+def find_daily_gaps(
+    datasets: Sequence[str] = tuple(DATASETS),
+    window: Optional[CoverageWindow] = None,
+    min_gap_days: int = 1,
+) -> List[Gap]:
+    # Run-length encoded outages (hotel, dataset, first..last missing day) for
+    # active hotels, over the contiguous span of `window` (default: the last
+    # 36 complete months). A day counts as present if it has any row; the
+    # monthly all-zero rule doesn't apply here. Paid media channels share a
+    # single paid_media scan
+    window = window or CoverageWindow.last(36)
+    bounds = window.params()
+    params = {
+        "window_start": bounds["window_start"],
+        "window_end": bounds["window_end"],
+        "min_gap_days": min_gap_days,
+    }
+
+    by_table: Dict[str, List] = {}
+    for dataset in datasets:
+        spec = get_spec(dataset)
+        by_table.setdefault(spec.table, []).append(spec)
+
+    gaps: List[Gap] = []
+    for table, specs in by_table.items():
+        if specs[0].media_channel:
+            names = {spec.media_channel: spec.name for spec in specs}
+            query = build_gap_query(table, by_channel=True)
+            table_params = {**params, "datasets": list(names)}
+        else:
+            # Non-paid tables hold one dataset each
+            names = {specs[0].name: specs[0].name}
+            query = build_gap_query(table)
+            table_params = {
+                **params,
+                "dataset": specs[0].name,
+                "datasets": [specs[0].name],
+            }
+        rows = cached_fetchall(query, table_params, execute=execute_prepared)
+        gaps.extend(
+            Gap(
+                row.hotel_code,
+                names[row.dataset],
+                row.gap_start,
+                row.gap_end,
+                row.days,
+            )
+            for row in rows
+        )
+    return sorted(gaps)
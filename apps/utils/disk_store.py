@@ -0,0 +1,71 @@
+import os
+import pickle
+from typing import Any, Optional
+
+
+class DiskLRUStore:
+    # Pickled entries, one file per key, evicted least recently used first
+    # once the directory passes max_bytes. Shared between processes: writes
+    # are atomic renames, and a file another process removed is just a miss
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def load(self, key: str) -> Optional[Any]:
+        try:
+            with open(self.path(key), "rb") as file:
+                return pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def touch(self, key: str) -> None:
+        # mtime doubles as the LRU timestamp
+        try:
+            os.utime(self.path(key))
+        except OSError:
+            pass
+
+    def save(self, key: str, entry: Any) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file:
+            pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def _entries(self):
+        if not os.path.isdir(self.directory):
+            return
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pkl"):
+                yield entry
+
+    def evict(self) -> None:
+        entries = []
+        total = 0
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self) -> None:
+        for entry in self._entries():
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
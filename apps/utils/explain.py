@@ -0,0 +1,317 @@
+import difflib
+import glob
+import importlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import text
+
+from apps.utils.coverage import (
+    DATASETS,
+    CoverageWindow,
+    brand_coverage_query,
+    channel_coverage_query,
+    coverage_query,
+)
+from apps.utils.daily_gaps import build_gap_query
+from apps.utils.database import get_session
+from apps.utils.prepared import RAW, exec_prepared_sql, prepare, to_prepare_sql
+from apps.utils.query_cache import CACHE_DIR
+
+APPS_DIR = Path(__file__).resolve().parents[1]
+FORECAST_PATTERN = "scripts/*/prophet/*/*_prophet.py"
+
+EXPLAIN_SNAPSHOT_DIR = os.getenv(
+    "QA_EXPLAIN_SNAPSHOT_DIR", os.path.join(CACHE_DIR, "plan_snapshots")
+)
+# Estimates off by at least this factor (either way) are reported
+ROW_ESTIMATE_FACTOR = float(os.getenv("QA_EXPLAIN_ROW_FACTOR", "10"))
+# Seq scans reading fewer rows than this aren't worth an index
+SEQ_SCAN_MIN_ROWS = int(os.getenv("QA_EXPLAIN_SEQ_SCAN_MIN_ROWS", "10000"))
+
+# Equality columns an index on each fact table may lead with; the date range
+# is always the trailing column
+INDEX_COLUMNS = {
+    "top_ref_domain": ("hotel_id",),
+    "visit_revenue": ("hotel_id",),
+    "source_traffic": ("hotel_id",),
+    "channel_mix": ("hotel_id",),
+    "paid_media": ("hotel_id", "media_id"),
+}
+
+_INDEX_COLUMNS_RE = re.compile(r"USING \w+ \((.*?)\)")
+
+
+class RegisteredQuery(NamedTuple):
+    name: str
+    query: Any
+    params: Dict[str, Any]
+    # Sent through execute_prepared (PREPARE/EXECUTE) rather than with binds
+    prepared: bool = False
+
+
+class PlanFinding(NamedTuple):
+    query: str
+    kind: str  # seq_scan, sort_spill, row_estimate, generic_plan
+    node: str
+    detail: str
+
+
+def registered_queries(hotel_code: str = "BOSFRUP") -> List[RegisteredQuery]:
+    # The statements the QA scripts actually send: one coverage check per
+    # dataset, the combined paid media / brand.com checks, the daily gap
+    # scans and every Prophet fetch (bound to one hotel)
+    window = CoverageWindow.last(6)
+    queries = []
+    for dataset in DATASETS:
+        query, params = coverage_query(dataset, window)
+        queries.append(
+            RegisteredQuery(f"coverage/{dataset}", query, params, prepared=True)
+        )
+
+    query, params, _ = channel_coverage_query(window)
+    queries.append(
+        RegisteredQuery("coverage/allChannels", query, params, prepared=True)
+    )
+    query, params, _ = brand_coverage_query(window)
+    queries.append(
+        RegisteredQuery("coverage/allDatasets", query, params, prepared=True)
+    )
+
+    bounds = CoverageWindow.last(36).params()
+    gap_params = {
+        "window_start": bounds["window_start"],
+        "window_end": bounds["window_end"],
+        "min_gap_days": 1,
+    }
+    tables = {spec.table: spec for spec in DATASETS.values()}
+    for table, spec in tables.items():
+        if spec.media_channel:
+            channels = [s.media_channel for s in DATASETS.values() if s.media_channel]
+            params = {**gap_params, "datasets": channels}
+            query = build_gap_query(table, by_channel=True)
+        else:
+            params = {**gap_params, "dataset": spec.name, "datasets": [spec.name]}
+            query = build_gap_query(table)
+        queries.append(RegisteredQuery(f"gaps/{table}", query, params, prepared=True))
+
+    for path in sorted(APPS_DIR.glob(FORECAST_PATTERN)):
+        relative = path.relative_to(APPS_DIR.parent).with_suffix("")
+        module = importlib.import_module(".".join(relative.parts))
+        name = "/".join(relative.parts[2:])
+        queries.append(
+            RegisteredQuery(
+                f"forecast/{name}", module.query, {"hotel_code": hotel_code}
+            )
+        )
+    return queries
+
+
+def explain(query, params: Dict[str, Any], prepared: bool = False) -> Dict[str, Any]:
+    # ANALYZE runs the statement; every registered query is a read-only SELECT.
+    # Prepared queries are explained the way production sends them, as
+    # EXECUTE of the statement prepared on this connection: the planner may
+    # pick a generic plan there, not the one the bound literals would get.
+    # On PostgreSQL 16+ the generic plan is kept too ("Generic Plan"), since
+    # a pooled connection switches to it after five executions when it looks
+    # no worse than the custom ones
+    analyze = "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) "
+    with get_session(timeout=None, label="explain", readonly=True) as session:
+        if not prepared:
+            statement = text(analyze + query.text.strip().rstrip(";"))
+            plan = parse_plan(session.execute(statement, params).scalar())
+            plan["Plan Mode"] = "bound literals"
+            return plan
+
+        conn = session.connection()
+        name, names = prepare(conn, query)
+        plan = parse_plan(
+            exec_prepared_sql(conn, analyze, name, names, params).scalar()
+        )
+        plan["Plan Mode"] = "prepared EXECUTE"
+        if conn.dialect.server_version_info >= (16,):
+            sql, _ = to_prepare_sql(query, conn.dialect)
+            try:
+                with session.begin_nested():
+                    generic = conn.exec_driver_sql(
+                        f"EXPLAIN (GENERIC_PLAN, FORMAT JSON) {sql}",
+                        execution_options=RAW,
+                    ).scalar()
+                plan["Generic Plan"] = parse_plan(generic)["Plan"]
+            except DBAPIError as error:
+                print(f"[WARN] GENERIC_PLAN failed: {error.orig}")
+    return plan
+
+
+def parse_plan(plan) -> Dict[str, Any]:
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]
+
+
+def walk(node: Dict[str, Any], depth: int = 0):
+    yield node, depth
+    for child in node.get("Plans", ()):
+        yield from walk(child, depth + 1)
+
+
+def node_label(node: Dict[str, Any]) -> str:
+    label = node["Node Type"]
+    if "Relation Name" in node:
+        label += f" on {node['Relation Name']}"
+    if "Index Name" in node:
+        label += f" using {node['Index Name']}"
+    return label
+
+
+def find_problems(name: str, plan: Dict[str, Any]) -> List[PlanFinding]:
+    findings = []
+    for node, _ in walk(plan["Plan"]):
+        loops = node.get("Actual Loops", 1) or 1
+        actual = node.get("Actual Rows", 0)
+        estimated = node.get("Plan Rows", 0)
+
+        if node["Node Type"] == "Seq Scan":
+            scanned = (actual + node.get("Rows Removed by Filter", 0)) * loops
+            if scanned >= SEQ_SCAN_MIN_ROWS:
+                detail = f"{scanned} rows read, {actual * loops} kept"
+                if "Filter" in node:
+                    detail += f"; filter {node['Filter']}"
+                findings.append(PlanFinding(name, "seq_scan", node_label(node), detail))
+
+        if node.get("Sort Space Type") == "Disk":
+            findings.append(
+                PlanFinding(
+                    name,
+                    "sort_spill",
+                    node_label(node),
+                    f"{node.get('Sort Method')} using {node.get('Sort Space Used')}kB "
+                    f"on disk; sort key {', '.join(node.get('Sort Key', ()))}",
+                )
+            )
+
+        # Estimates and actuals are both per loop; +1 keeps zero-row nodes sane
+        ratio = max(actual + 1, estimated + 1) / min(actual + 1, estimated + 1)
+        if ratio >= ROW_ESTIMATE_FACTOR:
+            findings.append(
+                PlanFinding(
+                    name,
+                    "row_estimate",
+                    node_label(node),
+                    f"estimated {estimated} rows, got {actual} ({ratio:.0f}x)",
+                )
+            )
+
+    generic = plan.get("Generic Plan")
+    if generic is not None and plan_shape({"Plan": generic}) != plan_shape(plan):
+        findings.append(
+            PlanFinding(
+                name,
+                "generic_plan",
+                node_label(generic),
+                f"generic plan differs from the executed one; costs "
+                f"{generic.get('Total Cost')} vs {plan['Plan'].get('Total Cost')}",
+            )
+        )
+    return findings
+
+
+def existing_indexes() -> Dict[str, List[Tuple[str, ...]]]:
+    with get_session(readonly=True) as session:
+        rows = session.execute(
+            text(
+                "SELECT tablename, indexdef FROM pg_indexes "
+                "WHERE schemaname = 'public' AND tablename = ANY(:tables)"
+            ),
+            {"tables": list(INDEX_COLUMNS)},
+        ).fetchall()
+    indexes: Dict[str, List[Tuple[str, ...]]] = {}
+    for row in rows:
+        match = _INDEX_COLUMNS_RE.search(row.indexdef)
+        if match:
+            columns = tuple(c.strip().strip('"') for c in match.group(1).split(","))
+            indexes.setdefault(row.tablename, []).append(columns)
+    return indexes
+
+
+def suggest_indexes(
+    findings: List[PlanFinding], indexes: Dict[str, List[Tuple[str, ...]]]
+) -> List[str]:
+    # For each seq-scanned fact table: a (column, date) index per equality
+    # column its filter uses, or (date, hotel_id) when it filters on the date
+    # range only. Skipped when an existing index already leads with the
+    # column(s) the filter needs
+    wanted = set()
+    for finding in findings:
+        if finding.kind != "seq_scan":
+            continue
+        table = finding.node.split(" on ")[-1]
+        if table not in INDEX_COLUMNS:
+            continue
+        columns = [c for c in INDEX_COLUMNS[table] if c in finding.detail]
+        for column in columns:
+            wanted.add((table, (column, "date"), 2))
+        if not columns:
+            # hotel_id rides along for the join/group by every query does next
+            wanted.add((table, ("date", "hotel_id"), 1))
+
+    statements = []
+    for table, columns, leading in sorted(wanted):
+        needed = columns[:leading]
+        if any(index[:leading] == needed for index in indexes.get(table, ())):
+            continue
+        statements.append(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+            f"ix_{table}_{'_'.join(columns)} ON public.{table} ({', '.join(columns)});"
+        )
+    return statements
+
+
+def plan_shape(plan: Dict[str, Any]) -> List[str]:
+    return ["  " * depth + node_label(node) for node, depth in walk(plan["Plan"])]
+
+
+def save_snapshot(
+    plans: Dict[str, Dict[str, Any]], directory: str = EXPLAIN_SNAPSHOT_DIR
+) -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    with open(path, "w") as f:
+        json.dump(plans, f, indent=2, default=str)
+    return path
+
+
+def latest_snapshot(
+    directory: str = EXPLAIN_SNAPSHOT_DIR, before: Optional[str] = None
+) -> Optional[str]:
+    paths = sorted(glob.glob(os.path.join(directory, "*.json")))
+    if before:
+        paths = [path for path in paths if path < before]
+    return paths[-1] if paths else None
+
+
+def load_snapshot(path: str) -> Dict[str, Dict[str, Any]]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def diff_snapshots(
+    old: Dict[str, Dict[str, Any]], new: Dict[str, Dict[str, Any]]
+) -> Dict[str, List[str]]:
+    # Per query: a unified diff of the plan trees (node types, relations and
+    # indexes; costs and timings are left out so only shape changes show)
+    diffs = {}
+    for name in sorted(set(old) & set(new)):
+        old_shape, new_shape = plan_shape(old[name]), plan_shape(new[name])
+        if old_shape != new_shape:
+            diffs[name] = list(
+                difflib.unified_diff(
+                    old_shape, new_shape, "before", "after", lineterm=""
+                )
+            )
+    return diffs
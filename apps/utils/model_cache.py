@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import pandas as pd
+from prophet import Prophet
+from prophet.serialize import model_from_json, model_to_json
+
+from apps.utils.database import env_bool
+from apps.utils.disk_store import DiskLRUStore
+from apps.utils.query_cache import CACHE_DIR
+from apps.utils.warm_start import fit_warm
+
+MODEL_CACHE_ENABLED = env_bool("PROPHET_CACHE_ENABLED", True)
+MODEL_CACHE_DIR = os.getenv("PROPHET_CACHE_DIR", os.path.join(CACHE_DIR, "models"))
+MODEL_CACHE_MAX_BYTES = int(os.getenv("PROPHET_CACHE_MAX_BYTES", str(256 * 1024**2)))
+
+
+def series_hash(df: pd.DataFrame) -> str:
+    # Timestamps and values as raw bytes; NaN months hash like any other value
+    ds = pd.to_datetime(df["ds"]).to_numpy("datetime64[ns]").view("int64")
+    y = df["y"].astype("float64").to_numpy()
+    digest = hashlib.sha256(ds.tobytes())
+    digest.update(y.tobytes())
+    return digest.hexdigest()
+
+
+def series_labels(df: pd.DataFrame) -> Tuple[str, ...]:
+    # hotel_code plus the domain/source/channel column, when the frame has one
+    return tuple(str(df[c].iloc[0]) for c in df.columns if c not in ("ds", "y"))
+
+
+class ModelCache:
+    def __init__(
+        self, directory: str = MODEL_CACHE_DIR, max_bytes: int = MODEL_CACHE_MAX_BYTES
+    ):
+        self.store = DiskLRUStore(directory, max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(
+        self, name: str, df: pd.DataFrame, config: Dict[str, Any]
+    ) -> Tuple[str, Dict[str, Any]]:
+        payload = {
+            "name": name,
+            "labels": series_labels(df),
+            "series": series_hash(df),
+            "config": config,
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest(), payload
+
+    def get(self, key: str) -> Optional[Tuple[Prophet, pd.DataFrame]]:
+        entry = self.store.load(key)
+        try:
+            model = model_from_json(entry["model"])
+            forecast = entry["forecast"]
+        except (TypeError, KeyError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        self.store.touch(key)
+        with self._lock:
+            self.hits += 1
+        return model, forecast
+
+    def put(
+        self,
+        key: str,
+        payload: Dict[str, Any],
+        model: Prophet,
+        forecast: pd.DataFrame,
+    ) -> None:
+        entry = {"key": payload, "model": model_to_json(model), "forecast": forecast}
+        self.store.save(key, entry)
+
+    def clear(self) -> None:
+        self.store.clear()
+
+
+model_cache = ModelCache()
+
+
+def fit_predict_cached(
+    name: str,
+    df: pd.DataFrame,
+    make_future: Callable[[Prophet], pd.DataFrame],
+    config: Dict[str, Any],
+) -> Tuple[Prophet, pd.DataFrame]:
+    # Prophet(**config).fit(df) then predict(make_future(model)), unless the
+    # same series (name, hotel/dimension labels, ds/y content, config) was
+    # fitted before; then the cached model and raw forecast are returned.
+    # name identifies the script/metric, whose make_future must not change
+    # without clearing the cache
+    if MODEL_CACHE_ENABLED:
+        key, payload = model_cache.key(name, df, config)
+        cached = model_cache.get(key)
+        if cached is not None:
+            return cached
+
+    # Changed series refit, warm-started from their previous parameters
+    model = fit_warm(name, series_labels(df), df[["ds", "y"]], config)
+    forecast = model.predict(make_future(model))
+
+    if MODEL_CACHE_ENABLED:
+        model_cache.put(key, payload, model, forecast)
+    return model, forecast
@@ -0,0 +1,88 @@
+import contextlib
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional, Sized, Tuple
+
+from apps.utils.database import init_worker
+
+# Worker processes for Prophet fits; 1 keeps the serial in-process path
+FIT_WORKERS = int(os.getenv("PROPHET_FIT_WORKERS", "1"))
+# BLAS/OpenMP threads per worker. cmdstan fits a single chain, so more than
+# one thread per worker mostly adds contention
+FIT_THREADS_PER_WORKER = int(os.getenv("PROPHET_FIT_THREADS", "1"))
+
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "STAN_NUM_THREADS",
+)
+
+
+def limit_threads(threads: int) -> None:
+    # The env vars cover spawned workers and the cmdstan subprocesses each fit
+    # launches; threadpoolctl (installed with scikit-learn) caps the BLAS pools
+    # a forked worker inherited already initialised
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return
+    threadpool_limits(threads)
+
+
+def init_fit_worker(threads: int) -> None:
+    init_worker()
+    limit_threads(threads)
+
+
+def _run_captured(function: Callable, args: Tuple) -> Tuple[Any, str]:
+    # Workers buffer their prints so the parent can replay them in task order
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        result = function(*args)
+    return result, buffer.getvalue()
+
+
+def fit_in_parallel(
+    function: Callable,
+    tasks: Iterable[Tuple],
+    workers: Optional[int] = None,
+    threads: int = FIT_THREADS_PER_WORKER,
+) -> List[Any]:
+    # Calls function(*task) for every task and returns the results in task
+    # order, with each task's output printed as a block in that same order.
+    # function must be importable at module level so workers can unpickle it;
+    # fits, metrics and plots happen in the worker, only results come back.
+    # tasks may be a generator: at most two per worker are queued at a time,
+    # so a streamed input is only read as fast as the workers fit it
+    workers = FIT_WORKERS if workers is None else workers
+    if isinstance(tasks, Sized):
+        workers = min(workers, len(tasks))
+    workers = max(1, workers)
+    if workers == 1:
+        return [function(*task) for task in tasks]
+
+    results = []
+    pending = deque()
+
+    def collect():
+        result, output = pending.popleft().result()
+        print(output, end="")
+        results.append(result)
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=init_fit_worker, initargs=(threads,)
+    ) as pool:
+        for task in tasks:
+            pending.append(pool.submit(_run_captured, function, task))
+            if len(pending) >= 2 * workers:
+                collect()
+        while pending:
+            collect()
+    return results
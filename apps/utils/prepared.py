@@ -0,0 +1,60 @@
+import hashlib
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.engine import CursorResult
+from sqlmodel import Session
+
+_PYFORMAT_RE = re.compile(r"%\((\w+)\)s")
+# no_parameters: the driver sends the text as-is, without %-formatting
+RAW = {"no_parameters": True}
+
+
+def to_prepare_sql(query, dialect) -> Tuple[str, List[str]]:
+    # Compile to the driver's %(name)s form, then number the binds for
+    # PREPARE ($1, $2, ...) in order of first appearance
+    sql = str(query.compile(dialect=dialect))
+    names: List[str] = []
+
+    def number(match: re.Match) -> str:
+        name = match.group(1)
+        if name not in names:
+            names.append(name)
+        return f"${names.index(name) + 1}"
+
+    sql = _PYFORMAT_RE.sub(number, sql).replace("%%", "%")
+    return sql.strip().rstrip(";"), names
+
+
+def prepare(conn, query) -> Tuple[str, List[str]]:
+    # Server-side prepared statements are per connection, so the names already
+    # prepared are remembered in the pooled connection's info dict and reused
+    # by every later checkout of that connection. Returns the statement name
+    # and its bind names in $n order
+    sql, names = to_prepare_sql(query, conn.dialect)
+    name = "qa_" + hashlib.sha1(sql.encode("utf-8")).hexdigest()[:16]
+    prepared = conn.connection.info.setdefault("prepared_statements", set())
+    if name not in prepared:
+        conn.exec_driver_sql(f"PREPARE {name} AS {sql}", execution_options=RAW)
+        prepared.add(name)
+    return name, names
+
+
+def exec_prepared_sql(
+    conn, prefix: str, name: str, names: List[str], params: Dict[str, Any]
+) -> CursorResult:
+    # `{prefix}EXECUTE name (...)`; prefix is "" or an EXPLAIN clause
+    if not names:
+        return conn.exec_driver_sql(f"{prefix}EXECUTE {name}", execution_options=RAW)
+    placeholders = ", ".join(f"%({n})s" for n in names)
+    return conn.exec_driver_sql(
+        f"{prefix}EXECUTE {name} ({placeholders})", {n: params.get(n) for n in names}
+    )
+
+
+def execute_prepared(
+    session: Session, query, params: Optional[Dict[str, Any]] = None
+) -> CursorResult:
+    conn = session.connection()
+    name, names = prepare(conn, query)
+    return exec_prepared_sql(conn, "", name, names, params or {})
@@ -0,0 +1,99 @@
+import importlib
+import inspect
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, List, NamedTuple, Optional, Sequence
+
+from apps.utils.database import MAX_OVERFLOW, POOL_SIZE, QueryTimeoutError
+
+APPS_DIR = Path(__file__).resolve().parents[1]
+CHECK_PATTERN = "scripts/*/missingData/*/*_missing_data.py"
+
+# Each check holds one pooled connection while it runs, so the default keeps
+# the runner inside the pool instead of queueing on overflow
+QA_WORKERS = int(os.getenv("QA_WORKERS", str(POOL_SIZE)))
+
+
+class Check(NamedTuple):
+    name: str
+    function: Callable
+    needs_months: bool
+
+
+class CheckResult(NamedTuple):
+    name: str
+    status: str
+    missing_rows: int
+    hotels: int
+    seconds: float
+    error: Optional[str] = None
+
+
+def discover_checks(pattern: Optional[str] = None) -> List[Check]:
+    # Every <group>/missingData/<dataset>/*_missing_data.py script exposes one
+    # sync get_* function returning (hotel_code, month) rows; custom-month
+    # checks take the month list as their first argument
+    checks = []
+    for path in sorted(APPS_DIR.glob(CHECK_PATTERN)):
+        relative = path.relative_to(APPS_DIR.parent).with_suffix("")
+        name = "/".join(relative.parts[2:]).replace("/missingData", "")
+        if pattern and pattern not in name:
+            continue
+        module = importlib.import_module(".".join(relative.parts))
+        functions = [
+            function
+            for function_name, function in inspect.getmembers(
+                module, inspect.isfunction
+            )
+            if function.__module__ == module.__name__
+            and function_name.startswith("get_")
+            and not function_name.endswith("_async")
+        ]
+        if len(functions) != 1:
+            raise RuntimeError(f"{name}: expected one get_* check function")
+        function = functions[0]
+        needs_months = any(
+            parameter.default is inspect.Parameter.empty
+            for parameter in inspect.signature(function).parameters.values()
+        )
+        checks.append(Check(name, function, needs_months))
+    return checks
+
+
+def run_check(check: Check, months: Optional[Sequence[str]] = None) -> CheckResult:
+    start = time.perf_counter()
+    try:
+        rows = check.function(list(months)) if check.needs_months else check.function()
+    except QueryTimeoutError as error:
+        return CheckResult(
+            check.name, "timeout", 0, 0, time.perf_counter() - start, str(error)
+        )
+    except Exception as error:
+        return CheckResult(
+            check.name, "error", 0, 0, time.perf_counter() - start, repr(error)
+        )
+    hotels = len({row.hotel_code for row in rows})
+    return CheckResult(check.name, "ok", len(rows), hotels, time.perf_counter() - start)
+
+
+def run_checks(
+    checks: Sequence[Check],
+    workers: int = QA_WORKERS,
+    months: Optional[Sequence[str]] = None,
+) -> List[CheckResult]:
+    # Results come back in discovery order; progress is printed as checks
+    # finish. Workers beyond the pool's hard limit would only wait on it
+    workers = max(1, min(workers, POOL_SIZE + MAX_OVERFLOW))
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qa") as pool:
+        futures = {pool.submit(run_check, check, months): check for check in checks}
+        for future in as_completed(futures):
+            result = future.result()
+            results[result.name] = result
+            print(
+                f"[{result.status.upper()}] {result.name}: "
+                f"{result.missing_rows} missing hotel-months in {result.seconds:.2f}s"
+            )
+    return [results[check.name] for check in checks]
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from sqlmodel import text
+
+from apps.utils.database import env_bool, get_session
+from apps.utils.disk_store import DiskLRUStore
+
+CACHE_ENABLED = env_bool("QA_CACHE_ENABLED", True)
+CACHE_DIR = os.getenv("QA_CACHE_DIR", ".qa_cache")
+CACHE_MAX_BYTES = int(os.getenv("QA_CACHE_MAX_BYTES", str(512 * 1024**2)))
+CACHE_TTL = float(os.getenv("QA_CACHE_TTL", str(24 * 3600)))
+# How long a probed table watermark is trusted before probing again
+WATERMARK_TTL = float(os.getenv("QA_CACHE_WATERMARK_TTL", "60"))
+
+_TABLE_RE = re.compile(r"\b(?:FROM|JOIN)\s+public\.(\w+)", re.I)
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_WHITESPACE_RE = re.compile(r"\s+")
+_VOLATILE_RE = re.compile(r"\b(?:CURRENT_DATE|CURRENT_TIMESTAMP|NOW\s*\()", re.I)
+
+
+def normalize_sql(sql: str) -> str:
+    # Only comments and whitespace are normalized: literals are part of the key
+    sql = _COMMENT_RE.sub(" ", sql)
+    return _WHITESPACE_RE.sub(" ", sql).strip().rstrip(";")
+
+
+def referenced_tables(sql: str) -> List[str]:
+    return sorted(set(_TABLE_RE.findall(sql)))
+
+
+def probe_watermark(session, table: str) -> List[Any]:
+    # n_tup_* change on every insert/update/delete and cost nothing to read,
+    # unlike a max(date) scan of the fact table. Backends flush these counters
+    # at most every PGSTAT_MAX_INTERVAL (60s), so a write may go unnoticed
+    # for up to that long after its commit, plus WATERMARK_TTL. Probe on the
+    # primary: a standby's pg_stat_user_tables counters don't move with WAL
+    # replay
+    counters = session.execute(
+        text(
+            "SELECT n_tup_ins, n_tup_upd, n_tup_del FROM pg_stat_user_tables "
+            "WHERE schemaname = 'public' AND relname = :table"
+        ),
+        {"table": table},
+    ).fetchone()
+    return list(counters) if counters else [None, None, None]
+
+
+class QueryCache:
+    def __init__(
+        self,
+        directory: str = CACHE_DIR,
+        max_bytes: int = CACHE_MAX_BYTES,
+        ttl: float = CACHE_TTL,
+        watermark_ttl: float = WATERMARK_TTL,
+    ):
+        self.store = DiskLRUStore(directory, max_bytes)
+        self.ttl = ttl
+        self.watermark_ttl = watermark_ttl
+        self.hits = 0
+        self.misses = 0
+        self._watermarks: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def key(self, sql: str, params: Optional[Dict[str, Any]]) -> str:
+        payload = {"sql": normalize_sql(sql), "params": params or {}}
+        if _VOLATILE_RE.search(sql):
+            # Results of CURRENT_DATE-relative queries change at midnight
+            payload["today"] = date.today().isoformat()
+        encoded = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def watermarks(self, tables: Sequence[str]) -> Dict[str, List[Any]]:
+        now = time.monotonic()
+        result = {}
+        stale = []
+        with self._lock:
+            for table in tables:
+                cached = self._watermarks.get(table)
+                if cached and now - cached[0] < self.watermark_ttl:
+                    result[table] = cached[1]
+                else:
+                    stale.append(table)
+        if stale:
+            with get_session(readonly=False) as session:
+                for table in stale:
+                    result[table] = probe_watermark(session, table)
+            with self._lock:
+                for table in stale:
+                    self._watermarks[table] = (now, result[table])
+        return result
+
+    def get_or_compute(
+        self,
+        sql: str,
+        params: Optional[Dict[str, Any]],
+        compute: Callable[[], Any],
+        tables: Optional[Sequence[str]] = None,
+    ) -> Any:
+        tables = referenced_tables(sql) if tables is None else list(tables)
+        key = self.key(sql, params)
+        watermarks = self.watermarks(tables)
+
+        entry = self.store.load(key)
+        if (
+            isinstance(entry, dict)
+            and time.time() - entry.get("created", 0) < self.ttl
+            and entry.get("watermarks") == watermarks
+        ):
+            self.store.touch(key)
+            self.hits += 1
+            return entry["value"]
+
+        self.misses += 1
+        value = compute()
+        self.store.save(
+            key, {"created": time.time(), "watermarks": watermarks, "value": value}
+        )
+        return value
+
+    def clear(self) -> None:
+        self.store.clear()
+        with self._lock:
+            self._watermarks.clear()
+
+
+query_cache = QueryCache()
+
+
+def cached_fetchall(
+    query,
+    params: Optional[Dict[str, Any]] = None,
+    execute: Optional[Callable] = None,
+    tables: Optional[Sequence[str]] = None,
+) -> List:
+    # execute(session, query, params) defaults to session.execute; pass e.g.
+    # execute_prepared to keep using prepared statements on a cache miss
+    def compute():
+        with get_session() as session:
+            if execute is None:
+                return session.execute(query, params or {}).fetchall()
+            return execute(session, query, params or {}).fetchall()
+
+    if not CACHE_ENABLED:
+        return compute()
+    return query_cache.get_or_compute(str(query), params, compute, tables)
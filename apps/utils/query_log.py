@@ -0,0 +1,220 @@
+import atexit
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# query_cache.CACHE_DIR, read here directly: query_cache imports database,
+# which imports this module
+_CACHE_DIR = os.getenv("QA_CACHE_DIR", ".qa_cache")
+QUERY_LOG_PATH = os.getenv("DB_QUERY_LOG", os.path.join(_CACHE_DIR, "query_log.jsonl"))
+QUERY_LOG_SUMMARY_PATH = os.getenv(
+    "DB_QUERY_LOG_SUMMARY", os.path.join(_CACHE_DIR, "query_log_summary.json")
+)
+_TRUE = ("1", "true", "yes", "on")
+# Print the slowest statements to stderr at exit; the summary file is
+# written either way
+QUERY_LOG_PRINT = os.getenv("DB_QUERY_LOG_PRINT", "").strip().lower() in _TRUE
+QUERY_LOG_SAMPLE_RATE = float(os.getenv("DB_QUERY_LOG_SAMPLE_RATE", "0.1"))
+# Statements slower than this are always written, regardless of sampling
+QUERY_LOG_SLOW_MS = float(os.getenv("DB_QUERY_LOG_SLOW_MS", "1000"))
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open
+HISTOGRAM_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+_INTERNAL_PATHS = (
+    os.sep + "sqlalchemy" + os.sep,
+    os.sep + "sqlmodel" + os.sep,
+    os.path.dirname(os.path.abspath(__file__)),
+    "contextlib.py",
+)
+
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_RE = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+|\$\d+")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def normalize_statement(statement: str) -> Tuple[str, str]:
+    # Returns (fingerprint, normalized text); literals and binds become "?"
+    normalized = _COMMENT_RE.sub(" ", statement)
+    normalized = _STRING_RE.sub("?", normalized)
+    normalized = _PARAM_RE.sub("?", normalized)
+    normalized = _NUMBER_RE.sub("?", normalized)
+    normalized = _IN_LIST_RE.sub("(?)", normalized)
+    normalized = _WHITESPACE_RE.sub(" ", normalized).strip().rstrip(";").lower()
+    fingerprint = hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+    return fingerprint, normalized
+
+
+def calling_script() -> Optional[str]:
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not any(path in filename for path in _INTERNAL_PATHS):
+            return f"{os.path.relpath(filename)}:{frame.f_lineno}"
+        frame = frame.f_back
+    return None
+
+
+class LatencyHistogram:
+    def __init__(self, statement: str):
+        self.statement = statement
+        self.counts = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+
+    def add(self, elapsed_ms: float, rows: Optional[int]) -> None:
+        self.counts[bisect_left(HISTOGRAM_BUCKETS_MS, elapsed_ms)] += 1
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if rows:
+            self.rows += rows
+
+    def to_dict(self) -> Dict:
+        labels = [f"<={b}ms" for b in HISTOGRAM_BUCKETS_MS]
+        labels.append(f">{HISTOGRAM_BUCKETS_MS[-1]}ms")
+        return {
+            "statement": self.statement,
+            "calls": self.calls,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "rows": self.rows,
+            "histogram": {
+                label: count for label, count in zip(labels, self.counts) if count
+            },
+        }
+
+
+class QueryLog:
+    def __init__(
+        self,
+        path: Optional[str] = QUERY_LOG_PATH,
+        summary_path: Optional[str] = QUERY_LOG_SUMMARY_PATH,
+        sample_rate: float = QUERY_LOG_SAMPLE_RATE,
+        slow_ms: float = QUERY_LOG_SLOW_MS,
+        print_summary: bool = QUERY_LOG_PRINT,
+    ):
+        self.path = path
+        self.summary_path = summary_path
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.print_summary = print_summary
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self._file = None
+
+    def record(
+        self, statement: str, elapsed_ms: float, rows: Optional[int], executemany: bool
+    ) -> None:
+        fingerprint, normalized = normalize_statement(statement)
+        with self._lock:
+            histogram = self.histograms.get(fingerprint)
+            if histogram is None:
+                histogram = self.histograms[fingerprint] = LatencyHistogram(normalized)
+            histogram.add(elapsed_ms, rows)
+
+        if not self.path:
+            return
+        if elapsed_ms < self.slow_ms and random.random() >= self.sample_rate:
+            return
+
+        line = json.dumps(
+            {
+                "ts": round(time.time(), 3),
+                "fingerprint": fingerprint,
+                "elapsed_ms": round(elapsed_ms, 3),
+                "rows": rows,
+                "executemany": executemany,
+                "script": calling_script(),
+                "pid": os.getpid(),
+            }
+        )
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, "a", buffering=1)
+            self._file.write(line + "\n")
+
+    def after_fork(self) -> None:
+        # A forked child starts with its own histograms and file handle
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self._file = None
+
+    def summary(self) -> List[Dict]:
+        with self._lock:
+            items = [
+                {"fingerprint": fingerprint, **histogram.to_dict()}
+                for fingerprint, histogram in self.histograms.items()
+            ]
+        return sorted(items, key=lambda item: item["total_ms"], reverse=True)
+
+    def close(self) -> None:
+        summary = self.summary()
+        if summary and self.summary_path:
+            directory = os.path.dirname(self.summary_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.summary_path, "w") as file:
+                json.dump(summary, file, indent=2)
+        if summary and self.print_summary:
+            if self.summary_path:
+                print(
+                    f"[INFO] Query latency summary written to: {self.summary_path}",
+                    file=sys.stderr,
+                )
+            for item in summary[:10]:
+                print(
+                    f"[QUERY] {item['fingerprint']} calls={item['calls']} "
+                    f"total={item['total_ms']:.1f}ms mean={item['mean_ms']:.1f}ms "
+                    f"max={item['max_ms']:.1f}ms",
+                    file=sys.stderr,
+                )
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def instrument_engine(engine: Engine, query_log: Optional[QueryLog] = None) -> QueryLog:
+    # The sync and async engines share one log
+    if query_log is None:
+        query_log = QueryLog()
+        atexit.register(query_log.close)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        context._query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        elapsed_ms = (time.perf_counter() - context._query_start) * 1000
+        rowcount = cursor.rowcount
+        rows = rowcount if rowcount is not None and rowcount >= 0 else None
+        query_log.record(statement, elapsed_ms, rows, executemany)
+
+    return query_log
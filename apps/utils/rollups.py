@@ -0,0 +1,315 @@
+import json
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Tuple
+
+import pandas as pd
+from sqlmodel import text
+
+from apps.utils.bulk_extract import fetch_dataframe
+from apps.utils.coverage import (
+    WINDOW_CTES,
+    CoverageWindow,
+    add_months,
+    range_scan,
+)
+from apps.utils.database import env_bool, get_session
+from apps.utils.prepared import execute_prepared
+from apps.utils.query_cache import probe_watermark
+
+# Prophet fetches read the monthly rollups while they are fresh
+ROLLUPS_ENABLED = env_bool("PROPHET_USE_ROLLUPS", True)
+
+# One row per rollup: the fact table's watermark when it was last refreshed
+# and the first month the rollup no longer covers
+REFRESH_TABLE = "rollup_refresh"
+
+
+class StaleRollupError(RuntimeError):
+    def __init__(self, table: str, reason: str):
+        self.table = table
+        self.reason = reason
+        super().__init__(f"{ROLLUPS[table].rollup_table} is stale: {reason}")
+
+
+@dataclass(frozen=True)
+class RollupSpec:
+    table: str
+    # SQL over the fact row `t` (plus `joins`) giving the rollup dimension;
+    # NULL dimensions, and every row of a table without one, are stored as ''
+    dimension: Optional[str] = None
+    joins: str = ""
+    metrics: Tuple[str, ...] = ()
+
+    @property
+    def rollup_table(self) -> str:
+        return f"{self.table}_monthly_rollup"
+
+
+ROLLUPS: Dict[str, RollupSpec] = {
+    spec.table: spec
+    for spec in (
+        RollupSpec(
+            "top_ref_domain",
+            "t.domain",
+            metrics=("visits", "booking", "room_nights", "revenue"),
+        ),
+        RollupSpec(
+            "visit_revenue", metrics=("traffic", "booking", "room_nights", "revenue")
+        ),
+        RollupSpec(
+            "source_traffic",
+            "sr.name",
+            "LEFT JOIN public.source sr ON t.source_id = sr.id",
+            ("visits", "booking", "revenue"),
+        ),
+        RollupSpec(
+            "channel_mix",
+            "ct.name",
+            "LEFT JOIN public.channel_type ct ON t.channel_type_id = ct.id",
+            ("revenue", "room_nights"),
+        ),
+        # No metric columns are read from paid_media; coverage only needs
+        # row counts per channel
+        RollupSpec("paid_media", "CAST(t.media_id AS TEXT)"),
+    )
+}
+
+
+def create_rollup_tables(tables: Optional[Sequence[str]] = None) -> None:
+    with get_session(timeout=None, label="create rollups", readonly=False) as session:
+        for table in tables or ROLLUPS:
+            spec = ROLLUPS[table]
+            metrics = "".join(f"\n    {metric} NUMERIC," for metric in spec.metrics)
+            session.execute(
+                text(
+                    f"""
+CREATE TABLE IF NOT EXISTS public.{spec.rollup_table} (
+    hotel_id BIGINT NOT NULL,
+    dimension TEXT NOT NULL,
+    month DATE NOT NULL,
+    row_count BIGINT NOT NULL,
+    day_count INTEGER NOT NULL,{metrics}
+    refreshed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (hotel_id, dimension, month)
+)"""
+                )
+            )
+            session.execute(
+                text(
+                    f"CREATE INDEX IF NOT EXISTS {spec.rollup_table}_month_idx "
+                    f"ON public.{spec.rollup_table} (month)"
+                )
+            )
+        session.execute(
+            text(
+                f"""
+CREATE TABLE IF NOT EXISTS public.{REFRESH_TABLE} (
+    table_name TEXT PRIMARY KEY,
+    watermark TEXT NOT NULL,
+    refreshed_through DATE NOT NULL,
+    refreshed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+)"""
+            )
+        )
+        session.commit()
+
+
+@lru_cache(maxsize=None)
+def build_refresh_query(spec: RollupSpec, windowed: bool):
+    columns = "".join(f", {metric}" for metric in spec.metrics)
+    sums = "".join(f",\n    SUM(t.{metric})" for metric in spec.metrics)
+    month = "CAST(DATE_TRUNC('month', t.date) AS DATE)"
+    dimension = f"COALESCE({spec.dimension}, '')" if spec.dimension else "''"
+    joins = f"\n{spec.joins}" if spec.joins else ""
+    group_by = f"t.hotel_id, {month}"
+    if spec.dimension:
+        group_by += f", {dimension}"
+    if windowed:
+        source = f"{WINDOW_CTES.rstrip(',')}\nSELECT"
+        scan = range_scan(spec.table, "t")
+        where = (
+            "\nWHERE t.date >= CAST(:window_start AS DATE)"
+            "\n  AND t.date < CAST(:window_end AS DATE)"
+        )
+    else:
+        source = "SELECT"
+        scan = f"public.{spec.table} t"
+        where = ""
+    return text(
+        f"""
+INSERT INTO public.{spec.rollup_table}
+    (hotel_id, dimension, month, row_count, day_count{columns})
+{source}
+    t.hotel_id,
+    {dimension},
+    {month},
+    COUNT(*),
+    COUNT(DISTINCT t.date){sums}
+FROM {scan}{joins}{where}
+GROUP BY {group_by}"""
+    )
+
+
+@lru_cache(maxsize=None)
+def build_mark_refreshed_query():
+    # A windowed refresh never moves refreshed_through backwards
+    return text(
+        f"""
+INSERT INTO public.{REFRESH_TABLE} (table_name, watermark, refreshed_through)
+VALUES (:table_name, :watermark, :refreshed_through)
+ON CONFLICT (table_name) DO UPDATE SET
+    watermark = EXCLUDED.watermark,
+    refreshed_through = CASE
+        WHEN CAST(:full AS BOOLEAN) THEN EXCLUDED.refreshed_through
+        ELSE GREATEST({REFRESH_TABLE}.refreshed_through, EXCLUDED.refreshed_through)
+    END,
+    refreshed_at = now()"""
+    )
+
+
+def refresh_rollup(table: str, months: Optional[Sequence[str]] = None) -> int:
+    # months=None rebuilds the whole rollup; otherwise only those "YYYY-MM"
+    # months are deleted and re-aggregated. Either way readers see the old
+    # rows until the single transaction commits. The fact table's watermark
+    # is probed first, so writes landing during the refresh leave it stale.
+    # A windowed refresh vouches for the other months too: run --full after
+    # backfills or corrections to older months
+    spec = ROLLUPS[table]
+    label = f"refresh {spec.rollup_table}"
+    with get_session(timeout=None, label=label, readonly=False) as session:
+        watermark = probe_watermark(session, spec.table)
+        if months is None:
+            session.execute(text(f"DELETE FROM public.{spec.rollup_table}"))
+            result = session.execute(build_refresh_query(spec, False))
+            refreshed_through = add_months(date.today().replace(day=1), 1)
+        else:
+            params = CoverageWindow.custom(months).params()
+            session.execute(
+                text(
+                    f"DELETE FROM public.{spec.rollup_table} "
+                    "WHERE month = ANY(CAST(:month_list AS DATE[]))"
+                ),
+                params,
+            )
+            result = session.execute(build_refresh_query(spec, True), params)
+            refreshed_through = params["window_end"]
+        session.execute(
+            build_mark_refreshed_query(),
+            {
+                "table_name": spec.table,
+                "watermark": json.dumps(watermark, default=str),
+                "refreshed_through": refreshed_through,
+                "full": months is None,
+            },
+        )
+        session.commit()
+        return result.rowcount
+
+
+def rollup_staleness(table: str, window_end) -> Optional[str]:
+    # None when the rollup can answer for months before window_end, else why
+    # not. Read on the primary, where probe_watermark must run. The watermark
+    # covers the whole fact table: any write, even to a month outside the
+    # window, marks every month stale until the next refresh, and readers
+    # fall back to the raw tables meanwhile. Refresh right after each load.
+    # The write counters lag commits by up to PGSTAT_MAX_INTERVAL (60s), so a
+    # rollup can still read as fresh that long after a load
+    with get_session(readonly=False) as session:
+        exists = session.execute(
+            text("SELECT to_regclass(:name) IS NOT NULL"),
+            {"name": f"public.{REFRESH_TABLE}"},
+        ).scalar()
+        if not exists:
+            return "never refreshed"
+        marker = session.execute(
+            text(
+                f"SELECT watermark, refreshed_through FROM public.{REFRESH_TABLE} "
+                "WHERE table_name = :table_name"
+            ),
+            {"table_name": table},
+        ).fetchone()
+        if marker is None:
+            return "never refreshed"
+        watermark = json.loads(json.dumps(probe_watermark(session, table), default=str))
+    if watermark != json.loads(marker.watermark):
+        return "fact table changed since the last refresh"
+    if str(window_end) > str(marker.refreshed_through):
+        return f"refreshed through {marker.refreshed_through} only"
+    return None
+
+
+def refresh_rollups(
+    tables: Optional[Sequence[str]] = None, months: Optional[Sequence[str]] = None
+) -> Dict[str, int]:
+    return {table: refresh_rollup(table, months) for table in tables or ROLLUPS}
+
+
+@lru_cache(maxsize=None)
+def build_series_query(spec: RollupSpec, metric: str, by_dimension: bool):
+    dimension = "\n    r.dimension," if by_dimension else ""
+    condition = "\n  AND r.dimension <> ''" if by_dimension else ""
+    order = "h.code, r.dimension, " if by_dimension else "h.code, "
+    return text(
+        f"""
+SELECT
+    h.code AS hotel_code,{dimension}
+    CAST(r.month AS TIMESTAMPTZ) AS ds,
+    r.{metric} AS y
+FROM public.{spec.rollup_table} r
+JOIN public.hotel h ON r.hotel_id = h.id
+WHERE (CAST(:hotel_code AS TEXT) IS NULL OR h.code = :hotel_code)
+  AND h.is_active = TRUE
+  AND r.month >= CAST(:window_start AS DATE)
+  AND r.month < CAST(:window_end AS DATE){condition}
+ORDER BY {order}ds"""
+    )
+
+
+def fetch_rollup_series(
+    table: str,
+    metric: str,
+    hotel_code: Optional[str],
+    columns: Sequence[str],
+    months: int = 36,
+) -> pd.DataFrame:
+    # Monthly (hotel_code, [dimension,] ds, y) series for the `months` complete
+    # months before the current one, shaped like the Prophet fetch_* frames,
+    # for one hotel or (hotel_code=None) every active hotel.
+    # Rows without a dimension (no source/domain/channel type) are left out,
+    # as the inner joins in the original queries did. Raises StaleRollupError
+    # rather than return data as of an older refresh
+    spec = ROLLUPS[table]
+    by_dimension = spec.dimension is not None
+    window = CoverageWindow.last(months).params()
+    reason = rollup_staleness(table, window["window_end"])
+    if reason:
+        raise StaleRollupError(table, reason)
+    params = {
+        "hotel_code": hotel_code,
+        "window_start": window["window_start"],
+        "window_end": window["window_end"],
+    }
+    with get_session() as session:
+        result = execute_prepared(
+            session, build_series_query(spec, metric, by_dimension), params
+        )
+        return pd.DataFrame(result.fetchall(), columns=list(columns))
+
+
+def fetch_series(
+    query,
+    columns: Sequence[str],
+    rollup: Tuple[str, str],
+    hotel_code: Optional[str] = None,
+) -> pd.DataFrame:
+    # A Prophet script's series: from the (table, metric) rollup while it is
+    # fresh, else from the script's own query over the raw table. That query
+    # takes hotel_code=None for every active hotel
+    if ROLLUPS_ENABLED:
+        try:
+            return fetch_rollup_series(*rollup, hotel_code, columns)
+        except StaleRollupError as error:
+            print(f"[WARN] {error}; aggregating {error.table}")
+    return fetch_dataframe(query, {"hotel_code": hotel_code}, list(columns))
@@ -0,0 +1,110 @@
+import os
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from sqlmodel import text
+
+from apps.utils.database import get_session
+
+# Rows fetched per round trip from the server-side cursor
+STREAM_CHUNK_SIZE = int(os.getenv("DB_STREAM_CHUNK_SIZE", "10000"))
+
+
+def stream_rows(
+    query,
+    params: Optional[Dict[str, Any]] = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> Iterator[List]:
+    # stream_results opens a named (server-side) cursor on psycopg2, so only
+    # chunk_size rows are held client-side at a time
+    with get_session() as session:
+        result = session.execute(
+            query,
+            params or {},
+            execution_options={"stream_results": True, "yield_per": chunk_size},
+        )
+        for rows in result.partitions():
+            yield rows
+
+
+def stream_dataframes(
+    query,
+    params: Optional[Dict[str, Any]] = None,
+    columns: Optional[Sequence[str]] = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> Iterator[pd.DataFrame]:
+    for rows in stream_rows(query, params, chunk_size):
+        yield pd.DataFrame(rows, columns=columns)
+
+
+def stream_groups(
+    query,
+    params: Optional[Dict[str, Any]] = None,
+    columns: Optional[Sequence[str]] = None,
+    by: Sequence[str] = ("hotel_code",),
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> Iterator[Tuple[Tuple, pd.DataFrame]]:
+    # The query must be ORDER BY the `by` columns: a group is yielded as soon
+    # as a later key shows up, so memory holds one group plus one chunk
+    by = list(by)
+    pending: Optional[pd.DataFrame] = None
+    for chunk in stream_dataframes(query, params, columns, chunk_size):
+        if pending is not None:
+            chunk = pd.concat([pending, chunk], ignore_index=True)
+        groups = list(chunk.groupby(by, sort=False, dropna=False))
+        for key, group in groups[:-1]:
+            yield key, group.reset_index(drop=True)
+        pending = groups[-1][1].reset_index(drop=True)
+    if pending is not None and not pending.empty:
+        yield tuple(pending[by].iloc[0]), pending
+
+
+def stream_all_hotels(
+    query,
+    columns: Optional[Sequence[str]] = None,
+    by: Sequence[str] = ("hotel_code",),
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> Iterator[Tuple[Tuple, pd.DataFrame]]:
+    # A per-hotel query filtering on (CAST(:hotel_code AS TEXT) IS NULL OR
+    # h.code = :hotel_code), run once for every active hotel and handed back
+    # one `by` group at a time. It must be ORDER BY the `by` columns. The
+    # session and its transaction stay open until the generator is exhausted,
+    # so consume it before slow per-group work rather than interleaving
+    return stream_groups(query, {"hotel_code": None}, columns, by, chunk_size)
+
+
+paid_media_query = text(
+    """
+    SELECT
+        h.code AS hotel_code,
+        mc.name AS media_channel,
+        pm.*
+    FROM public.paid_media pm
+    JOIN public.hotel h ON pm.hotel_id = h.id
+    JOIN public.media_channel mc ON pm.media_id = mc.id
+    WHERE pm.date >= DATE_TRUNC('month', CURRENT_DATE) - INTERVAL '36 month'
+      AND pm.date < DATE_TRUNC('month', CURRENT_DATE)
+      AND (CAST(:hotel_code AS TEXT) IS NULL OR h.code = :hotel_code)
+      AND (CAST(:media_channel AS TEXT) IS NULL OR mc.name = :media_channel)
+      AND h.is_active = TRUE
+    ORDER BY h.code, mc.name, pm.date
+    """
+)
+
+
+def stream_paid_media(
+    media_channel: Optional[str] = None,
+    hotel_code: Optional[str] = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> Iterator[Tuple[Tuple, pd.DataFrame]]:
+    # The last 36 complete months of daily paid_media rows, for every active
+    # hotel unless hotel_code is given, one (hotel_code, media_channel) group
+    # at a time. Columns are the table's own, after hotel_code and media_channel
+    params = {"hotel_code": hotel_code, "media_channel": media_channel}
+    return stream_groups(
+        paid_media_query,
+        params,
+        by=("hotel_code", "media_channel"),
+        chunk_size=chunk_size,
+    )
@@ -0,0 +1,171 @@
+import atexit
+import glob
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from prophet import Prophet
+
+from apps.utils.database import env_bool
+from apps.utils.query_cache import CACHE_DIR
+
+WARM_START_ENABLED = env_bool("PROPHET_WARM_START", True)
+WARM_START_DIR = os.getenv(
+    "PROPHET_WARM_START_DIR", os.path.join(CACHE_DIR, "prophet_params")
+)
+
+SCALAR_PARAMS = ("k", "m", "sigma_obs")
+VECTOR_PARAMS = ("delta", "beta")
+
+# Fits recorded by this process tree since import feed the exit summary
+RUN_STARTED = time.time()
+
+
+def fitted_params(model: Prophet) -> Dict[str, Any]:
+    # MAP fits hold (1, 1) scalars and (1, N) vectors; constant series skip
+    # Stan and store (1,) arrays instead, so flatten rather than index
+    params = {name: float(np.ravel(model.params[name])[0]) for name in SCALAR_PARAMS}
+    params.update(
+        {name: np.ravel(model.params[name]).tolist() for name in VECTOR_PARAMS}
+    )
+    return params
+
+
+def init_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    # Prophet falls back to its own init for any delta/beta whose shape no
+    # longer matches (e.g. a different changepoint count)
+    init = {name: params[name] for name in SCALAR_PARAMS}
+    init.update({name: np.array(params[name]) for name in VECTOR_PARAMS})
+    return init
+
+
+def param_drift(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, float]:
+    # Absolute change per scalar; largest element change for same-shape vectors
+    drift = {name: abs(new[name] - old[name]) for name in SCALAR_PARAMS}
+    for name in VECTOR_PARAMS:
+        if len(old[name]) == len(new[name]):
+            drift[name] = float(
+                np.max(np.abs(np.subtract(new[name], old[name])), initial=0.0)
+            )
+    return drift
+
+
+def state_path(name: str, labels, config: Dict[str, Any]) -> str:
+    payload = json.dumps(
+        {"name": name, "labels": labels, "config": config}, sort_keys=True
+    )
+    key = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return os.path.join(WARM_START_DIR, f"{key}.json")
+
+
+def load_state(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_state(path: str, state: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def fit_warm(name: str, labels, df: pd.DataFrame, config: Dict[str, Any]) -> Prophet:
+    # Prophet(**config).fit(df), initialised from the parameters this series
+    # (name, labels, config) ended up with last time. The state file also
+    # keeps the series' last cold fit (time, length, when) as the baseline
+    # the run summary compares warm fits against
+    if not WARM_START_ENABLED:
+        model = Prophet(**config)
+        model.fit(df)
+        return model
+
+    path = state_path(name, labels, config)
+    state = load_state(path)
+    if state and "cold" not in state:
+        # Written before cold baselines were kept: refit cold to record one
+        state = None
+
+    model = Prophet(**config)
+    start = time.perf_counter()
+    if state:
+        model.fit(df, init=init_params(state["params"]))
+    else:
+        model.fit(df)
+    seconds = time.perf_counter() - start
+
+    params = fitted_params(model)
+    if state:
+        cold = state["cold"]
+    else:
+        cold = {"seconds": seconds, "points": len(df), "at": time.time()}
+    save_state(
+        path,
+        {
+            "name": name,
+            "labels": list(labels),
+            "params": params,
+            "warm": state is not None,
+            "fit_seconds": seconds,
+            "points": len(df),
+            "cold": cold,
+            "drift": param_drift(state["params"], params) if state else {},
+            "updated": time.time(),
+        },
+    )
+    return model
+
+
+def run_states(since: float = RUN_STARTED) -> List[Dict[str, Any]]:
+    states = []
+    for path in glob.glob(os.path.join(WARM_START_DIR, "*.json")):
+        state = load_state(path)
+        if state and state.get("updated", 0) >= since:
+            states.append(state)
+    return states
+
+
+def print_warm_start_summary(since: float = RUN_STARTED) -> None:
+    states = run_states(since)
+    warm = [state for state in states if state["warm"]]
+    if not warm:
+        if states:
+            print(f"\n[INFO] Warm start: {len(states)} cold fits saved for next run")
+        return
+
+    # The baseline is each series' last cold fit, which ran on an older,
+    # shorter series; it is not a same-day cold refit
+    fit_time = sum(state["fit_seconds"] for state in warm)
+    cold_time = sum(state["cold"]["seconds"] for state in warm)
+    reduction = (1 - fit_time / cold_time) * 100 if cold_time else 0.0
+    age_days = np.median(
+        [(time.time() - state["cold"]["at"]) / 86400 for state in warm]
+    )
+    added = np.median([state["points"] - state["cold"]["points"] for state in warm])
+    print(
+        f"\n[INFO] Warm start: {len(warm)} of {len(states)} fits warm-started, "
+        f"{fit_time:.1f}s vs {cold_time:.1f}s for the same series' last cold fits "
+        f"({reduction:.0f}% less; those baselines are a median {age_days:.0f} days "
+        f"old and {added:.0f} points shorter)"
+    )
+    for param in SCALAR_PARAMS + VECTOR_PARAMS:
+        drifted = [state for state in warm if param in state["drift"]]
+        if drifted:
+            largest = max(drifted, key=lambda state: state["drift"][param])
+            print(
+                f"  {param}: max drift {largest['drift'][param]:.4g} "
+                f"({largest['name']} {' / '.join(largest['labels'])})"
+            )
+
+
+if WARM_START_ENABLED:
+    # Pool workers leave through os._exit, so only the parent prints
+    atexit.register(print_warm_start_summary)